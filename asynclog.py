@@ -0,0 +1,85 @@
+'''
+Journalisation asynchrone : les enregistrements passent par une file bornée
+vers un fil d'écoute qui les transmet aux destinations (fichier, console).
+'''
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+
+class BoundedQueueHandler(QueueHandler):
+    '''
+    Dépose les enregistrements dans une file bornée sans jamais attendre :
+    quand la file est pleine, le nouvel enregistrement est abandonné et compté.
+    '''
+
+    def __init__(self, capacity=10000):
+        super().__init__(queue.Queue(capacity))
+        self._dropped = 0
+        self._lock = threading.Lock()
+
+    @property
+    def dropped(self):
+        return self._dropped
+
+    def take_dropped(self):
+        '''
+        Nombre d'enregistrements abandonnés depuis le dernier appel
+        '''
+        with self._lock:
+            dropped, self._dropped = self._dropped, 0
+        return dropped
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+
+
+class DropReportingListener(QueueListener):
+    '''
+    QueueListener qui signale aux destinations les enregistrements abandonnés
+    par `BoundedQueueHandler`
+    '''
+
+    def __init__(self, queue_handler, *handlers):
+        super().__init__(queue_handler.queue, *handlers, respect_handler_level=True)
+        self.queue_handler = queue_handler
+
+    def _report_dropped(self, name):
+        dropped = self.queue_handler.take_dropped()
+        if dropped:
+            report = logging.LogRecord(name, logging.WARNING, __file__, 0,
+                                       '%d messages de journal abandonnés (file pleine)', (dropped,), None)
+            super().handle(report)
+
+    def handle(self, record):
+        self._report_dropped(record.name)
+        super().handle(record)
+
+    def enqueue_sentinel(self):
+        # La fin doit être signalée même si la file est pleine
+        self.queue.put(self._sentinel)
+
+    def stop(self):
+        if self._thread is not None:
+            super().stop()
+            self._report_dropped('asynclog')
+
+
+def attach(logger, handlers, capacity=10000):
+    '''
+    Relie `logger` aux destinations `handlers` par une file bornée et démarre
+    le fil d'écoute ; il est arrêté (et la file vidée) à la sortie du programme.
+    Retourne le `DropReportingListener`.
+    '''
+    queue_handler = BoundedQueueHandler(capacity)
+    logger.addHandler(queue_handler)
+    listener = DropReportingListener(queue_handler, *handlers)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,121 @@
+'''
+Sauvegarde automatique de l'état de la session, différée et hors du fil de
+l'interface.
+'''
+import logging
+import threading
+
+from PySide6.QtCore import QObject, QTimer, Slot
+
+logger = logging.getLogger('MyLens')
+
+
+class Autosaver(QObject):
+    '''
+    Enregistre l'état retourné par `snapshot()` (dictionnaire de valeurs
+    simples, comparables) avec `write(state)`, appelée dans un fil dédié.
+
+    `schedule()` relance un délai de `delay` ms : une rafale de modifications ne
+    donne qu'une seule photographie de l'état, prise à la fin du délai. Seul le
+    dernier état en attente est écrit si le fil est occupé, et un état égal au
+    dernier écrit n'est jamais réécrit.
+    '''
+
+    def __init__(self, snapshot, write, delay=1000, parent=None):
+        super().__init__(parent)
+        self._snapshot = snapshot
+        self._write = write
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay)
+        self._timer.timeout.connect(self.save)
+
+        self._condition = threading.Condition()
+        self._pending = None
+        self._written = None
+        self._writing = False
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='Autosaver', daemon=True)
+        self._thread.start()
+        # Fil arrêté aussi quand l'objet est détruit sans `stop()` (avec son
+        # parent, ou par deleteLater)
+        self.destroyed.connect(lambda: self._stop_thread())
+
+    @property
+    def delay(self):
+        return self._timer.interval()
+
+    def setDelay(self, delay):
+        self._timer.setInterval(delay)
+
+    @property
+    def last_written(self):
+        return self._written
+
+    @Slot()
+    def schedule(self):
+        '''
+        (Re)lance le délai avant la prochaine sauvegarde
+        '''
+        if not self._stopped:
+            self._timer.start()
+
+    @Slot()
+    def save(self):
+        '''
+        Photographie l'état et le transmet au fil d'écriture s'il a changé
+        '''
+        self._timer.stop()
+        state = self._snapshot()
+        with self._condition:
+            if self._stopped or state == self._pending:
+                return
+            if self._pending is None and not self._writing and state == self._written:
+                return
+            self._pending = state
+            self._condition.notify()
+
+    def flush(self, timeout=None):
+        '''
+        Sauvegarde immédiatement l'état et attend la fin de l'écriture
+        '''
+        self.save()
+        with self._condition:
+            self._condition.wait_for(lambda: self._pending is None and not self._writing, timeout)
+
+    def stop(self, timeout=None):
+        '''
+        Écrit l'état en attente puis arrête le fil d'écriture
+        '''
+        self.flush(timeout)
+        self._stop_thread(timeout)
+
+    def _stop_thread(self, timeout=None):
+        # Sans appel à Qt : utilisable pendant la destruction de l'objet
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending is not None or self._stopped)
+                if self._pending is None:
+                    return
+                state = self._pending
+                self._pending = None
+                if state == self._written:
+                    self._condition.notify_all()
+                    continue
+                self._writing = True
+            try:
+                self._write(state)
+            except Exception:
+                logger.exception('Échec de la sauvegarde automatique')
+            else:
+                self._written = state
+            finally:
+                with self._condition:
+                    self._writing = False
+                    self._condition.notify_all()
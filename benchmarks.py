@@ -0,0 +1,429 @@
+'''
+Mesures de performance des chemins critiques : génération SVG, rendu,
+glisser des sliders, calculs optiques, import des modules de calcul (sans Qt,
+avec un budget de durée) et démarrage de MainWindow.
+
+Chaque mesure donne les percentiles de latence par opération et la mémoire
+allouée (tracemalloc). Les résultats peuvent être enregistrés comme référence
+puis comparés : le script échoue si une médiane dépasse la référence de plus
+du seuil indiqué, ou si la référence est absente (elle dépend de la machine et
+n'est pas versionnée : la créer d'abord avec --save-baseline).
+
+    python benchmarks.py --save-baseline
+    python benchmarks.py --threshold 0.25
+    python benchmarks.py -k drag
+'''
+import os
+import sys
+import gc
+import json
+import time
+import argparse
+import subprocess
+import tracemalloc
+
+APPDIR = os.path.dirname(os.path.abspath(os.path.realpath(__file__)))
+DEFAULT_BASELINE = os.path.join(APPDIR, 'benchmarks_baseline.json')
+
+WIDTHS = (300, 800, 1600)
+
+# Médianes maximales (µs) imposées quelle que soit la référence ; l'import
+# seul dure environ 100 ms, numpy compris
+BUDGETS = {
+    'import.optics': 160000,
+    'import.stacking': 160000,
+    'import.lensbatch': 160000,
+}
+
+_benchmarks = dict()
+_app = None
+
+
+def benchmark(name, repeat=200):
+    '''
+    Enregistre une mesure. La fonction décorée prépare l'état et retourne
+    l'opération à chronométrer (sans argument) ; si l'opération retourne une
+    durée (ns), celle-ci remplace la durée de l'appel, par exemple pour
+    exclure un nettoyage.
+    '''
+    def decorator(setup):
+        _benchmarks[name] = (setup, repeat)
+        return setup
+    return decorator
+
+
+def application():
+    global _app
+    if _app is None:
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        from PySide6.QtWidgets import QApplication
+        _app = QApplication.instance() or QApplication([])
+    return _app
+
+
+def _widget(cls_name, width=None):
+    import mywidgets
+
+    application()
+    widget = getattr(mywidgets, cls_name)()
+    if width is not None and cls_name != 'FovDisplay':
+        widget.resize(width, widget.height())
+    return widget
+
+
+# ---------------------------------------------
+# Génération SVG
+# ---------------------------------------------
+
+def _register_svg():
+    for cls_name in ('FovDisplay', 'FNumberBar', 'DofBar'):
+        for width in ((None,) if cls_name == 'FovDisplay' else WIDTHS):
+            name = 'svg.{}'.format(cls_name) if width is None else 'svg.{}.{}'.format(cls_name, width)
+
+            def setup(cls_name=cls_name, width=width):
+                widget = _widget(cls_name, width)
+                return widget.generate_svg
+            benchmark(name, repeat=300)(setup)
+
+_register_svg()
+
+
+# ---------------------------------------------
+# Rendu
+# ---------------------------------------------
+
+def _register_paint():
+    for cls_name in ('FovDisplay', 'FNumberBar', 'DofBar'):
+        def setup_paint(cls_name=cls_name):
+            from PySide6.QtGui import QImage
+
+            widget = _widget(cls_name, 800)
+            image = QImage(widget.size(), QImage.Format_ARGB32_Premultiplied)
+
+            def paint():
+                widget.render(image)
+            return paint
+        benchmark('paint.{}'.format(cls_name), repeat=300)(setup_paint)
+
+        def setup_draw(cls_name=cls_name):
+            from PySide6.QtGui import QImage, QPainter
+
+            widget = _widget(cls_name, 800)
+            image = QImage(widget.size(), QImage.Format_ARGB32_Premultiplied)
+
+            def draw():
+                image.fill(0)
+                painter = QPainter(image)
+                painter.setRenderHint(QPainter.Antialiasing)
+                widget.draw(painter)
+                painter.end()
+            return draw
+        benchmark('draw.{}'.format(cls_name), repeat=300)(setup_draw)
+
+_register_paint()
+
+
+# ---------------------------------------------
+# Glisser de la souris
+# ---------------------------------------------
+
+def _drag(cls_name, y):
+    from PySide6.QtCore import Qt, QPointF, QEvent
+    from PySide6.QtGui import QMouseEvent
+
+    app = application()
+    widget = _widget(cls_name, 800)
+    widget.show()
+    app.processEvents()
+
+    def event(kind, x):
+        return QMouseEvent(kind, QPointF(x, y), QPointF(x, y), Qt.LeftButton,
+                           Qt.NoButton if kind == QEvent.MouseButtonRelease else Qt.LeftButton, Qt.NoModifier)
+
+    def drag():
+        app.sendEvent(widget, event(QEvent.MouseButtonPress, 20))
+        for i in range(1000):
+            app.sendEvent(widget, event(QEvent.MouseMove, 20 + i*0.75))
+            if i % 8 == 0:
+                app.processEvents()
+        app.sendEvent(widget, event(QEvent.MouseButtonRelease, 770))
+        app.processEvents()
+    return drag
+
+
+@benchmark('drag.DofBar', repeat=10)
+def setup_drag_dof():
+    return _drag('DofBar', 40)
+
+
+@benchmark('drag.FNumberBar', repeat=10)
+def setup_drag_fnumber():
+    return _drag('FNumberBar', 13)
+
+
+# ---------------------------------------------
+# Calculs optiques
+# ---------------------------------------------
+
+@benchmark('optics.scalar', repeat=20)
+def setup_optics_scalar():
+    import numpy
+
+    dof_bar = _widget('DofBar')
+    fov_view = _widget('FovDisplay')
+    distances = numpy.geomspace(0.2, 500, 1000).tolist()
+
+    def scalar():
+        for d in distances:
+            dof_bar.setFocusDistance(d)
+            fov_view.setFocusDistance(d)
+            (dof_bar.hyperfocal_distance, dof_bar.focusing_distance_near, dof_bar.focusing_distance_far,
+             fov_view.fov_angle, fov_view.focus_plane_width, fov_view.focus_plane_height)
+    return scalar
+
+
+@benchmark('optics.batch', repeat=200)
+def setup_optics_batch():
+    import numpy
+    import optics
+
+    distances = numpy.geomspace(0.2, 500, 1000)
+
+    def batch():
+        optics.compute(24.0, 8.0, 0.015, 22.2, 14.8, distances)
+    return batch
+
+
+# ---------------------------------------------
+# Import des modules de calcul
+# ---------------------------------------------
+
+_IMPORT_CHECK = '''
+import sys
+import time
+import importlib
+t0 = time.perf_counter_ns()
+importlib.import_module({!r})
+elapsed = time.perf_counter_ns() - t0
+qt = sorted(name for name in sys.modules if name.split('.')[0] in ('PySide6', 'shiboken6'))
+if qt:
+    sys.exit('Qt importé : ' + ', '.join(qt))
+print(elapsed)
+'''
+
+
+def _register_import():
+    # Durée de l'import seul, mesurée dans un nouveau processus comme pour un
+    # traitement par lots de courte durée (le lancement de l'interpréteur
+    # n'est pas compté) ; échoue si Qt est importé
+    for module in ('optics', 'stacking', 'lensbatch'):
+        def setup(module=module):
+            command = [sys.executable, '-c', _IMPORT_CHECK.format(module)]
+
+            def run_import():
+                output = subprocess.run(command, cwd=APPDIR, check=True,
+                                        stdout=subprocess.PIPE, text=True).stdout
+                return int(output.split()[-1])
+            return run_import
+        benchmark('import.{}'.format(module), repeat=10)(setup)
+
+_register_import()
+
+
+# ---------------------------------------------
+# Démarrage
+# ---------------------------------------------
+
+def _startup(deferred):
+    from PySide6.QtCore import QEvent, QObject
+
+    app = application()
+    import gui
+
+    class FirstPaint(QObject):
+        def __init__(self):
+            super().__init__()
+            self.painted = None
+
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Paint and self.painted is None:
+                self.painted = time.perf_counter_ns()
+            return False
+
+    from PySide6.QtCore import QCoreApplication
+
+    def startup():
+        # Jusqu'à l'affichage de FovDisplay, dernier des widgets de la
+        # fenêtre : ni la suite de la boucle d'événements (où commence la
+        # restauration différée), ni la fermeture ne sont comptées
+        t0 = time.perf_counter_ns()
+        window = gui.MainWindow(deferred=deferred)
+        spy = FirstPaint()
+        window.fov_view.installEventFilter(spy)
+        window.show()
+        while spy.painted is None:
+            app.processEvents()
+        elapsed = spy.painted - t0
+        window.hide()
+        window.deleteLater()
+        app.processEvents()
+        QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+        return elapsed
+    return startup
+
+
+@benchmark('startup.MainWindow', repeat=10)
+def setup_startup():
+    return _startup(False)
+
+
+@benchmark('startup.MainWindow.deferred', repeat=10)
+def setup_startup_deferred():
+    # Jusqu'à la première image, avant la restauration de la session
+    return _startup(True)
+
+
+# ---------------------------------------------
+# Exécution
+# ---------------------------------------------
+
+def _percentile(sorted_values, p):
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run(name, repeat=None):
+    '''
+    Exécute une mesure et retourne ses statistiques (latences en µs)
+    '''
+    setup, default_repeat = _benchmarks[name]
+    repeat = repeat or default_repeat
+    operation = setup()
+
+    for _ in range(max(1, repeat // 10)):
+        operation()
+
+    gc.collect()
+    gc.disable()
+    try:
+        timings = list()
+        for _ in range(repeat):
+            t0 = time.perf_counter_ns()
+            elapsed = operation()
+            if elapsed is None:
+                elapsed = time.perf_counter_ns() - t0
+            timings.append(elapsed / 1000)
+    finally:
+        gc.enable()
+    timings.sort()
+
+    # Mémoire : pic et blocs restants par opération, sur une passe séparée
+    runs = max(1, min(repeat, 20))
+    tracemalloc.start()
+    try:
+        before_current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for _ in range(runs):
+            operation()
+        after_current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return dict(
+        repeat=repeat,
+        mean_us=sum(timings) / len(timings),
+        p50_us=_percentile(timings, 50),
+        p90_us=_percentile(timings, 90),
+        p99_us=_percentile(timings, 99),
+        max_us=timings[-1],
+        peak_alloc_kib=(peak - before_current) / 1024,
+        retained_kib=(after_current - before_current) / 1024 / runs,
+    )
+
+
+def compare(results, baseline, threshold):
+    '''
+    Liste des (nom, médiane, référence) dont la médiane dépasse la référence
+    de plus de `threshold` (fraction)
+    '''
+    regressions = list()
+    for name, stats in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        if stats['p50_us'] > reference['p50_us'] * (1 + threshold):
+            regressions.append((name, stats['p50_us'], reference['p50_us']))
+    return regressions
+
+
+def over_budget(results):
+    '''
+    Liste des (nom, médiane, budget) dont la médiane dépasse `BUDGETS`
+    '''
+    return [(name, stats['p50_us'], BUDGETS[name])
+            for name, stats in results.items() if name in BUDGETS and stats['p50_us'] > BUDGETS[name]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-k', dest='pattern', default='', help='ne lance que les mesures contenant PATTERN')
+    parser.add_argument('--repeat', type=int, help='nombre de répétitions de chaque mesure')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='fichier de référence JSON')
+    parser.add_argument('--save-baseline', action='store_true', help='enregistre les résultats comme référence')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='régression tolérée sur la médiane (0.2 = +20 %%)')
+    parser.add_argument('--json', help='écrit les résultats dans ce fichier')
+    args = parser.parse_args(argv)
+
+    names = [name for name in _benchmarks if args.pattern in name]
+    results = dict()
+    print('{:<26} {:>10} {:>10} {:>10} {:>10} {:>11} {:>11}'.format(
+        'benchmark', 'p50 µs', 'p90 µs', 'p99 µs', 'max µs', 'peak KiB', 'kept KiB'))
+    for name in names:
+        stats = run(name, args.repeat)
+        results[name] = stats
+        print('{:<26} {p50_us:>10.1f} {p90_us:>10.1f} {p99_us:>10.1f} {max_us:>10.1f} '
+              '{peak_alloc_kib:>11.1f} {retained_kib:>11.2f}'.format(name, **stats))
+
+    if args.json:
+        with open(args.json, 'wt', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    exceeded = over_budget(results)
+    for name, value, budget in exceeded:
+        print('BUDGET DÉPASSÉ {} : {:.1f} µs pour {:.1f} µs'.format(name, value, budget))
+    if exceeded:
+        return 1
+
+    if args.save_baseline:
+        baseline = dict()
+        if os.path.exists(args.baseline):
+            with open(args.baseline, 'rt', encoding='utf-8') as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'wt', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print('Référence enregistrée dans {}'.format(args.baseline))
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print('RÉFÉRENCE ABSENTE {} : aucune comparaison (créer avec --save-baseline)'.format(
+            args.baseline), file=sys.stderr)
+        return 2
+    with open(args.baseline, 'rt', encoding='utf-8') as f:
+        baseline = json.load(f)
+    for name in results:
+        if name not in baseline:
+            print('Pas de référence pour {}'.format(name), file=sys.stderr)
+    regressions = compare(results, baseline, args.threshold)
+    for name, value, reference in regressions:
+        print('RÉGRESSION {} : {:.1f} µs contre {:.1f} µs (+{:.0%})'.format(
+            name, value, reference, value / reference - 1))
+    if regressions:
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,415 @@
+'''
+Chargement et indexation du catalogue de capteurs et d'objectifs (constants.json).
+
+`load_catalog` lit le catalogue dans un cache binaire compilé à partir du JSON
+(fichier `.cache` à côté du JSON) et projeté en mémoire ; le cache est
+reconstruit lorsque le JSON change (taille, date de modification puis
+empreinte SHA-256).
+'''
+import os
+import re
+import json
+import mmap
+import bisect
+import struct
+import heapq
+import hashlib
+import itertools
+import unicodedata
+from collections.abc import Mapping
+
+
+def load_constants(path):
+    '''
+    Retourne les dictionnaires (SENSOR_SIZES, LENS_FOCALS) lus dans `path`.
+
+    `SENSOR_SIZES` associe à chaque nom de capteur sa taille [l, h] en mm,
+    `LENS_FOCALS` associe à chaque nom d'objectif sa focale en mm ; la
+    dernière entrée de `LENS_FOCALS` correspond à la focale personnalisée.
+    '''
+    with open(path, 'rt', encoding='utf-8') as f:
+        json_data = json.load(f)
+    return json_data['SENSOR_SIZES'], json_data['LENS_FOCALS']
+
+
+# ---------------------------------------------
+# Cache binaire
+# ---------------------------------------------
+#
+# En-tête : magique, taille et date (ns) du JSON source, SHA-256 du JSON,
+# nombre de sections. Chaque section : nom, nombre d'entrées n, nombre de
+# valeurs par entrée k, taille des noms, puis (alignés sur 8 octets)
+#   float64[n*k] valeurs, uint32[n+1] décalages des noms,
+#   uint32[n] ordre des noms triés (octets UTF-8), noms UTF-8 terminés par
+#   un saut de ligne.
+
+CACHE_MAGIC = b'LENSCAT1'
+_HEADER = struct.Struct('<8sQq32sI')
+_SECTION = struct.Struct('<16sIII')
+SECTIONS = ('SENSOR_SIZES', 'LENS_FOCALS')
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+class CatalogSection(Mapping):
+    '''
+    Section du catalogue lue dans le cache binaire, sans copie : nom -> taille
+    [l, h] pour les capteurs, nom -> focale pour les objectifs. L'ordre du
+    JSON est conservé ; la recherche par nom est une dichotomie dans l'index
+    trié des noms.
+    '''
+
+    def __init__(self, buffer, offset):
+        self._buffer = buffer
+        key, n, width, blob_size = _SECTION.unpack_from(buffer, offset)
+        self.key = key.rstrip(b'\0').decode('ascii')
+        self._n = n
+        self.width = width
+        view = memoryview(buffer)
+        offset = _align(offset + _SECTION.size)
+        if offset + 8*n*width + 8*n + 4 + blob_size > len(buffer):
+            raise ValueError('truncated catalog section {}'.format(self.key))
+        self._values = view[offset:offset + 8*n*width].cast('d')
+        offset += 8*n*width
+        self._offsets = view[offset:offset + 4*(n + 1)].cast('I')
+        offset += 4*(n + 1)
+        self._order = view[offset:offset + 4*n].cast('I')
+        offset += 4*n
+        self._blob = offset
+        self._blob_size = blob_size
+        self.end = _align(offset + blob_size)
+
+    def __len__(self):
+        return self._n
+
+    def _name_bytes(self, i):
+        return self._buffer[self._blob + self._offsets[i]:self._blob + self._offsets[i + 1] - 1]
+
+    def name(self, i):
+        return self._name_bytes(i).decode('utf-8')
+
+    def value(self, i):
+        if self.width == 1:
+            return self._values[i]
+        return self._values[i*self.width:(i + 1)*self.width].tolist()
+
+    def index(self, name):
+        '''
+        Indice de l'entrée `name` (KeyError si absente)
+        '''
+        key = name.encode('utf-8')
+        k = bisect.bisect_left(self._order, key, key=self._name_bytes)
+        if k < self._n and self._name_bytes(self._order[k]) == key:
+            return self._order[k]
+        raise KeyError(name)
+
+    def __getitem__(self, name):
+        return self.value(self.index(name))
+
+    def __contains__(self, name):
+        try:
+            self.index(name)
+        except KeyError:
+            return False
+        return True
+
+    def names(self):
+        '''
+        Liste des noms, décodés en un seul appel
+        '''
+        if self._n == 0:
+            return []
+        blob = self._buffer[self._blob:self._blob + self._offsets[self._n] - 1]
+        return blob.decode('utf-8').split('\n')
+
+    def __iter__(self):
+        return iter(self.names())
+
+    def __reversed__(self):
+        return (self.name(i) for i in reversed(range(self._n)))
+
+    def values(self):
+        values = self._values.tolist()
+        if self.width == 1:
+            return values
+        return [values[i:i + self.width] for i in range(0, len(values), self.width)]
+
+
+def compile_catalog(json_bytes, size=0, mtime_ns=0):
+    '''
+    Contenu du cache binaire correspondant au JSON `json_bytes`
+    '''
+    json_data = json.loads(json_bytes.decode('utf-8'))
+    parts = [_HEADER.pack(CACHE_MAGIC, size, mtime_ns, hashlib.sha256(json_bytes).digest(), len(SECTIONS))]
+    offset = _HEADER.size
+    for key in SECTIONS:
+        entries = json_data[key]
+        names = [name.replace('\n', ' ').encode('utf-8') for name in entries]
+        values = [entries[name] for name in entries]
+        width = len(values[0]) if values and isinstance(values[0], list) else 1
+        flat = [float(x) for v in values for x in (v if width > 1 else (v,))]
+        offsets = [0]
+        for name in names:
+            offsets.append(offsets[-1] + len(name) + 1)
+        order = sorted(range(len(names)), key=names.__getitem__)
+        blob = b''.join(name + b'\n' for name in names)
+
+        section = [_SECTION.pack(key.encode('ascii'), len(names), width, len(blob))]
+        section.append(bytes(_align(offset + _SECTION.size) - offset - _SECTION.size))
+        section.append(struct.pack('<{}d'.format(len(flat)), *flat))
+        section.append(struct.pack('<{}I'.format(len(offsets)), *offsets))
+        section.append(struct.pack('<{}I'.format(len(order)), *order))
+        section.append(blob)
+        length = sum(len(part) for part in section)
+        section.append(bytes(_align(offset + length) - offset - length))
+        parts.extend(section)
+        offset += sum(len(part) for part in section)
+    return b''.join(parts)
+
+
+def _map(path):
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _sections(buffer):
+    '''
+    Sections de `buffer` ; ValueError (ou struct.error) si le cache est tronqué
+    ou incohérent
+    '''
+    _, _, _, _, count = _HEADER.unpack_from(buffer, 0)
+    sections = dict()
+    offset = _HEADER.size
+    for _ in range(count):
+        section = CatalogSection(buffer, offset)
+        # Noms décodés une fois : leur nombre doit être celui des entrées
+        if len(section) and (section._offsets[len(section)] != section._blob_size
+                             or len(section.names()) != len(section)):
+            raise ValueError('corrupt catalog section {}'.format(section.key))
+        sections[section.key] = section
+        offset = section.end
+    if set(sections) != set(SECTIONS):
+        raise ValueError('missing catalog sections')
+    return tuple(sections[key] for key in SECTIONS)
+
+
+def _read_cache(cache_path):
+    '''
+    Sections lues dans le cache, None s'il est illisible, tronqué ou corrompu
+    '''
+    try:
+        buffer = _map(cache_path)
+    except (OSError, ValueError):
+        return None
+    try:
+        return _sections(buffer)
+    except (ValueError, struct.error):
+        pass
+    try:
+        buffer.close()
+    except BufferError:
+        pass
+    return None
+
+
+def load_catalog(path, cache_path=None):
+    '''
+    Retourne les sections (SENSOR_SIZES, LENS_FOCALS) du catalogue `path`, lues
+    dans son cache binaire (`cache_path`, par défaut à côté du JSON), compilé
+    à nouveau si le JSON a changé ou si le cache est tronqué ou corrompu. Si le
+    cache ne peut pas être écrit, le catalogue compilé reste en mémoire.
+    '''
+    if cache_path is None:
+        cache_path = os.path.splitext(path)[0] + '.cache'
+    stat = os.stat(path)
+
+    header = None
+    try:
+        with open(cache_path, 'rb') as f:
+            header = _HEADER.unpack(f.read(_HEADER.size))
+    except (OSError, struct.error):
+        pass
+    if header is not None and header[0] == CACHE_MAGIC and header[1:3] == (stat.st_size, stat.st_mtime_ns):
+        sections = _read_cache(cache_path)
+        if sections is not None:
+            return sections
+
+    with open(path, 'rb') as f:
+        json_bytes = f.read()
+    if header is not None and header[0] == CACHE_MAGIC and header[3] == hashlib.sha256(json_bytes).digest():
+        # JSON touché mais inchangé : seule la date est mise à jour
+        try:
+            with open(cache_path, 'r+b') as f:
+                f.write(_HEADER.pack(CACHE_MAGIC, stat.st_size, stat.st_mtime_ns, header[3], header[4]))
+        except OSError:
+            pass
+        sections = _read_cache(cache_path)
+        if sections is not None:
+            return sections
+
+    data = compile_catalog(json_bytes, stat.st_size, stat.st_mtime_ns)
+    try:
+        tmp_path = cache_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        return _sections(data)
+    return _sections(_map(cache_path))
+
+
+_WORD = re.compile(r'\w+')
+_COMBINING = re.compile('[\u0300-\u036f]')
+
+
+def normalize(text):
+    '''
+    Texte en minuscules et sans accents
+    '''
+    text = text.casefold()
+    if not text.isascii():
+        text = _COMBINING.sub('', unicodedata.normalize('NFKD', text))
+    return text
+
+
+def tokens(text):
+    '''
+    Mots d'un nom, en minuscules et sans accents
+    '''
+    return _WORD.findall(normalize(text))
+
+
+class CatalogIndex:
+    '''
+    Index des préfixes de mots des noms d'un catalogue, pour le filtrage à la
+    frappe : une recherche coûte une dichotomie par mot de la requête plus le
+    nombre de résultats demandés, quelle que soit la taille du catalogue.
+
+    Avec `build=False`, l'index est construit par étapes avec `build_steps()`,
+    par exemple depuis la boucle d'événements ; en attendant, `search()`
+    parcourt le texte des noms déjà découpés en mots.
+    '''
+    CHUNK_SIZE = 500 # noms traités par étape de construction
+
+    def __init__(self, names, build=True):
+        self.names = names
+        self._entry_tokens = list()
+        # Blocs découpés : (premier nom, mots de chaque nom précédés d'une
+        # espace à raison d'une ligne par nom, débuts des lignes)
+        self._chunks = list()
+        self._tokens = None
+        self._ids = None
+        if build:
+            for _ in self.build_steps(len(names) or 1):
+                pass
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def ready(self):
+        return self._tokens is not None
+
+    def build_steps(self, chunk_size=CHUNK_SIZE):
+        '''
+        Construit l'index par étapes d'au plus `chunk_size` noms (ou mots) :
+        générateur à épuiser, chaque étape étant courte
+        '''
+        runs = list()
+        for start in range(len(self._entry_tokens), len(self.names), chunk_size):
+            chunk = self.names[start:start + chunk_size]
+            # Normalisation de tous les noms du bloc en un seul appel
+            lines = normalize('\n'.join(name.replace('\n', ' ') for name in chunk)).split('\n')
+            entry_tokens = [tuple(set(_WORD.findall(line))) for line in lines]
+            all_tokens = list()
+            all_ids = list()
+            for i, tokens in enumerate(entry_tokens, start):
+                all_tokens.extend(tokens)
+                all_ids.extend([i] * len(tokens))
+            order = sorted(range(len(all_tokens)), key=all_tokens.__getitem__)
+            runs.append(([all_tokens[k] for k in order], [all_ids[k] for k in order]))
+            self._entry_tokens.extend(entry_tokens)
+            if chunk_size < len(self.names):
+                words = [' ' + ' '.join(tokens) for tokens in entry_tokens]
+                line_starts = list(itertools.accumulate((len(w) + 1 for w in words[:-1]), initial=0))
+                self._chunks.append((start, '\n'.join(words), line_starts))
+            yield
+
+        if len(runs) <= 1:
+            self._tokens, self._ids = runs[0] if runs else ([], [])
+        else:
+            # Fusion des blocs triés, elle aussi par étapes
+            all_tokens = list()
+            all_ids = list()
+            merged = heapq.merge(*(zip(*run) for run in runs))
+            while True:
+                batch = list(itertools.islice(merged, 4*chunk_size))
+                if not batch:
+                    break
+                all_tokens.extend(token for token, _ in batch)
+                all_ids.extend(i for _, i in batch)
+                yield
+            self._tokens = all_tokens
+            self._ids = all_ids
+        self._chunks = list()
+
+    def _prefix_range(self, prefix):
+        lo = bisect.bisect_left(self._tokens, prefix)
+        hi = bisect.bisect_left(self._tokens, prefix + '\U0010ffff', lo)
+        return lo, hi
+
+    def search(self, query, limit=100):
+        '''
+        Indices des entrées dont chaque mot de `query` commence un mot du nom,
+        au plus `limit`
+        '''
+        query_tokens = tokens(query)
+        if not query_tokens:
+            return list(range(min(limit, len(self.names))))
+        if not self.ready:
+            return self._linear_search(query_tokens, limit)
+
+        # Parcours de la plage du mot le plus discriminant, les autres mots
+        # étant vérifiés sur les mots de chaque candidat
+        ranges = [(self._prefix_range(token), token) for token in query_tokens]
+        ranges.sort(key=lambda r: r[0][1] - r[0][0])
+        (lo, hi), _ = ranges[0]
+        others = [token for _, token in ranges[1:]]
+
+        results = list()
+        seen = set()
+        for k in range(lo, hi):
+            i = self._ids[k]
+            if i in seen:
+                continue
+            seen.add(i)
+            entry_tokens = self._entry_tokens[i]
+            if all(any(t.startswith(token) for t in entry_tokens) for token in others):
+                results.append(i)
+                if len(results) >= limit:
+                    break
+        results.sort()
+        return results
+
+    def _linear_search(self, query_tokens, limit):
+        '''
+        `search()` pendant la construction : recherche du premier mot dans le
+        texte des blocs déjà découpés en mots, les autres noms étant ignorés
+        '''
+        first = ' ' + query_tokens[0]
+        others = [' ' + token for token in query_tokens[1:]]
+        results = list()
+        for start, text, line_starts in self._chunks:
+            pos = text.find(first)
+            while pos >= 0:
+                k = bisect.bisect_right(line_starts, pos) - 1
+                end = line_starts[k + 1] - 1 if k + 1 < len(line_starts) else len(text)
+                words = text[line_starts[k]:end]
+                if all(token in words for token in others):
+                    results.append(start + k)
+                    if len(results) >= limit:
+                        return results
+                pos = text.find(first, end)
+        return results
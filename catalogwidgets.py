@@ -0,0 +1,193 @@
+'''
+Listes déroulantes du catalogue : modèle chargé à la demande et filtrage à la
+frappe par l'index de `catalog.CatalogIndex`.
+'''
+import time
+
+from PySide6.QtCore import Qt, Signal, Slot, QAbstractListModel, QModelIndex, QTimer
+from PySide6.QtWidgets import QComboBox, QCompleter, QListView
+
+from catalog import CatalogIndex
+
+
+class CatalogModel(QAbstractListModel):
+    '''
+    Noms d'un catalogue exposés par lots de `BATCH_SIZE` lignes (canFetchMore
+    / fetchMore) : les vues n'interrogent que les lignes chargées.
+
+    `rows` donne les indices des entrées affichées, toutes par défaut ; le rôle
+    `Qt.UserRole` retourne l'indice de l'entrée dans le catalogue.
+    '''
+    BATCH_SIZE = 256
+
+    def __init__(self, names, rows=None, parent=None):
+        super().__init__(parent)
+        self._names = names
+        self._rows = range(len(names)) if rows is None else rows
+        self._loaded = min(self.BATCH_SIZE, len(self._rows))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= self._loaded:
+            return None
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return self._names[self._rows[index.row()]]
+        if role == Qt.UserRole:
+            return self._rows[index.row()]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._loaded < len(self._rows)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        self.ensureLoaded(self._loaded + self.BATCH_SIZE - 1)
+
+    def ensureLoaded(self, row):
+        '''
+        Charge les lignes jusqu'à `row` inclus
+        '''
+        end = min(row + 1, len(self._rows))
+        if end > self._loaded:
+            self.beginInsertRows(QModelIndex(), self._loaded, end - 1)
+            self._loaded = end
+            self.endInsertRows()
+
+    def setRows(self, rows):
+        self.beginResetModel()
+        self._rows = rows
+        self._loaded = min(self.BATCH_SIZE, len(rows))
+        self.endResetModel()
+
+
+class CatalogComboBox(QComboBox):
+    '''
+    Liste déroulante éditable des entrées d'un catalogue. Le texte saisi filtre
+    les entrées par préfixes de mots ; le choix d'une suggestion sélectionne
+    l'entrée correspondante. La ligne `i` de la liste est l'entrée `i` du
+    catalogue.
+
+    L'index est construit par étapes courtes depuis la boucle d'événements
+    pour ne pas retarder l'affichage, sauf si un `CatalogIndex` est fourni
+    (`index`), par exemple pour le partager entre plusieurs listes. En
+    attendant, la saisie filtre les noms déjà découpés en mots et les
+    suggestions sont recalculées une fois l'index prêt.
+
+    Avec `names=None`, la liste reste vide jusqu'à `setCatalog()`.
+    '''
+    entryChanged = Signal(str)
+
+    MAX_MATCHES = 100
+    BUILD_BUDGET = 0.005 # s de construction de l'index par passage dans la boucle
+
+    def __init__(self, names, parent=None, index=None):
+        super().__init__(parent)
+        self._names = []
+        self._index = None
+        self._build_steps = None
+        self._build_timer = QTimer(self)
+        self._build_timer.setInterval(0)
+        self._build_timer.timeout.connect(self._build_index)
+
+        # Largeur et hauteur des lignes fixes : rien n'est mesuré entrée par entrée
+        self.setSizeAdjustPolicy(QComboBox.AdjustToMinimumContentsLengthWithIcon)
+        self.setMinimumContentsLength(16)
+        view = QListView(self)
+        view.setUniformItemSizes(True)
+        self.setView(view)
+        self.setModel(CatalogModel(self._names, parent=self))
+
+        self.setEditable(True)
+        self.setInsertPolicy(QComboBox.NoInsert)
+        self._matches = CatalogModel(self._names, rows=[], parent=self)
+        completer = QCompleter(self._matches, self)
+        completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        completer.setCaseSensitivity(Qt.CaseInsensitive)
+        completer.popup().setUniformItemSizes(True)
+        completer.activated[QModelIndex].connect(self._on_match_activated)
+        self.setCompleter(completer)
+
+        self.lineEdit().textEdited.connect(self._on_text_edited)
+        self.lineEdit().editingFinished.connect(self._restore_text)
+        self.currentIndexChanged.connect(self._on_index_changed)
+
+        if names is not None or index is not None:
+            self.setCatalog(names, index)
+
+    def setCatalog(self, names, index=None):
+        '''
+        Remplace les entrées de la liste ; la première est sélectionnée
+        '''
+        if index is not None:
+            self._names = index.names
+            self._index = index
+            self._build_steps = None
+            self._build_timer.stop()
+        else:
+            self._names = list(names)
+            self._index = CatalogIndex(self._names, build=False)
+            self._build_steps = self._index.build_steps()
+            self._build_timer.start()
+        self._matches = CatalogModel(self._names, rows=[], parent=self)
+        self.completer().setModel(self._matches)
+        self.setModel(CatalogModel(self._names, parent=self))
+
+    @Slot()
+    def _build_index(self):
+        deadline = time.perf_counter() + self.BUILD_BUDGET
+        for _ in self._build_steps:
+            if time.perf_counter() > deadline:
+                return
+        self._build_timer.stop()
+        self._build_steps = None
+        # Suggestions affichées pendant la construction : complétées
+        if self.completer().popup().isVisible():
+            self._on_text_edited(self.lineEdit().text())
+
+    @property
+    def index(self):
+        '''
+        Index du catalogue, éventuellement en cours de construction
+        '''
+        return self._index
+
+    def setCurrentIndex(self, index):
+        self.model().ensureLoaded(index)
+        super().setCurrentIndex(index)
+
+    def currentEntry(self):
+        return self.itemText(self.currentIndex())
+
+    def search(self, text):
+        '''
+        Indices des entrées correspondant à `text`
+        '''
+        if self._index is None:
+            return []
+        return self._index.search(text, self.MAX_MATCHES)
+
+    @Slot(str)
+    def _on_text_edited(self, text):
+        self._matches.setRows(self.search(text))
+        if self._matches.rowCount():
+            self.completer().complete()
+
+    @Slot(QModelIndex)
+    def _on_match_activated(self, index):
+        entry = index.data(Qt.UserRole)
+        if entry is not None:
+            self.setCurrentIndex(entry)
+        self._restore_text()
+
+    @Slot()
+    def _restore_text(self):
+        # Le texte saisi ne correspond pas forcément à une entrée
+        self.lineEdit().setText(self.currentEntry())
+
+    @Slot(int)
+    def _on_index_changed(self, index):
+        if index >= 0:
+            self.entryChanged.emit(self.itemText(index))
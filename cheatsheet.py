@@ -0,0 +1,259 @@
+'''
+Export hors écran de fiches de profondeur de champ (PNG, SVG et PDF
+multipage) pour une liste de configurations boîtier/objectif.
+
+Chaque page regroupe les rendus de DofBar, FNumberBar et FovDisplay. Les pages
+sont calculées en parallèle dans un pool de processus ; le PDF est ensuite
+assemblé à partir des SVG des pages (`generate_svg()` des widgets).
+
+    python cheatsheet.py -o fiches --fnumber 8 --distance 3
+    python cheatsheet.py -o fiches --configs configurations.json --jobs 8
+'''
+import os
+import re
+import sys
+import json
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape
+
+import optics
+import instrumentation
+from catalog import load_constants
+
+APPDIR = os.path.dirname(os.path.abspath(os.path.realpath(__file__)))
+
+PAGE_WIDTH = 640
+MARGIN = 20
+
+_app = None
+
+
+def configurations(sensors, lenses, f_number=8.0, distance=3.0, confusion='DIGITAL'):
+    '''
+    Une configuration par couple capteur/objectif du catalogue (la focale
+    personnalisée, dernière entrée de `lenses`, est ignorée)
+    '''
+    configs = list()
+    for sensor in sensors:
+        for lens in list(lenses)[:-1]:
+            configs.append(dict(sensor=sensor, sensor_size=list(sensors[sensor]),
+                                lens=lens, focal=float(lenses[lens]),
+                                f_number=f_number, distance=distance, confusion=confusion))
+    return configs
+
+
+def _init_worker():
+    '''
+    Crée l'application Qt hors écran du processus
+    '''
+    global _app
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PySide6.QtWidgets import QApplication
+    _app = QApplication.instance() or QApplication([])
+
+
+def _svg_body(svg_bytes):
+    '''
+    Contenu de l'élément racine <svg> d'un document SVG
+    '''
+    svg = svg_bytes.decode('utf-8')
+    svg = re.sub(r'^\s*<\?xml[^>]*\?>\s*', '', svg)
+    svg = re.sub(r'^<svg[^>]*>', '', svg, count=1)
+    return svg[:svg.rindex('</svg>')]
+
+
+def _title(config):
+    return '{} · {} · {:g} mm · f/{:.3g} · {:.3g} m'.format(
+        config['sensor'], config['lens'], config['focal'], config['f_number'], config['distance'])
+
+
+class Page:
+    '''
+    Widgets d'une page, réglés selon une configuration
+    '''
+
+    def __init__(self, config):
+        from mywidgets import FovDisplay, FNumberBar, DofBar
+
+        self.config = config
+        w, h = config['sensor_size']
+        confusion = config.get('confusion', 'DIGITAL')
+        if isinstance(confusion, str):
+            confusion = float(optics.confusion_size(w, h, confusion))
+
+        self.dof_bar = DofBar()
+        self.fnumber_bar = FNumberBar()
+        self.fov_view = FovDisplay()
+        for widget in (self.dof_bar, self.fnumber_bar):
+            widget.resize(PAGE_WIDTH - 2*MARGIN, widget.height())
+
+        self.fov_view.setSensorSize((w, h))
+        self.fov_view.setFocalLength(config['focal'])
+        self.dof_bar.setSensorSize((w, h))
+        self.dof_bar.setFocalLength(config['focal'])
+        self.dof_bar.setConfusionSize(confusion)
+        self.fnumber_bar.setSensorSize((w, h))
+        self.fnumber_bar.setConfusionSize(confusion)
+        self.fnumber_bar.setFNumber(config['f_number'])
+        self.dof_bar.setFNumber(self.fnumber_bar.f_number)
+        self.dof_bar.setFocusDistance(config['distance'])
+        self.fov_view.setFocusDistance(self.dof_bar.focusing_distance)
+
+        # (y, widget) : position verticale de chaque widget dans la page
+        self.layout = list()
+        y = MARGIN + 30
+        for widget in (self.dof_bar, self.fnumber_bar, self.fov_view):
+            self.layout.append((y, widget))
+            y += widget.height() + 12
+        self.height = y - 12 + MARGIN
+
+    @property
+    def size(self):
+        return PAGE_WIDTH, self.height
+
+    def svg(self):
+        parts = ['''<?xml version="1.0" encoding="utf-8"?>
+<svg
+xmlns="http://www.w3.org/2000/svg"
+version="1.1"
+width="{w}px"
+height="{h}px"
+viewBox="0 0 {w} {h}"
+>
+  <rect fill="white" stroke="none" x="0" y="0" width="{w}" height="{h}" />
+  <text
+    x="{m}" y="{m_text}"
+    font-family="Segoe UI"
+    font-size="14"
+    fill="black">
+    {title}
+  </text>'''.format(w=PAGE_WIDTH, h=self.height, m=MARGIN, m_text=MARGIN + 12, title=escape(_title(self.config)))]
+        for y, widget in self.layout:
+            parts.append('  <g transform="translate({},{})">'.format(MARGIN, y))
+            parts.append(_svg_body(widget.generate_svg()))
+            parts.append('  </g>')
+        parts.append('</svg>')
+        return '\n'.join(parts).encode('utf-8')
+
+    def image(self, scale=1.0):
+        from PySide6.QtCore import Qt, QPointF
+        from PySide6.QtGui import QImage, QPainter, QFont, QColor
+
+        width, height = self.size
+        image = QImage(int(width*scale), int(height*scale), QImage.Format_ARGB32_Premultiplied)
+        image.setDevicePixelRatio(scale)
+        image.fill(Qt.white)
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.Antialiasing)
+        font = QFont('Segoe UI')
+        font.setPixelSize(14)
+        painter.setFont(font)
+        painter.setPen(QColor('black'))
+        painter.drawText(QPointF(MARGIN, MARGIN + 12), _title(self.config))
+        for y, widget in self.layout:
+            painter.save()
+            painter.translate(MARGIN, y)
+            widget.draw(painter)
+            painter.restore()
+        painter.end()
+        return image
+
+
+def render_page(index, config, out_dir, formats=('png', 'svg'), scale=1.0):
+    '''
+    Produit la page `index` : écrit les fichiers PNG/SVG demandés et retourne
+    (index, SVG de la page)
+    '''
+    page = Page(config)
+    svg = page.svg()
+    name = os.path.join(out_dir, 'page_{:04d}'.format(index))
+    if 'svg' in formats:
+        with open(name + '.svg', 'wb') as f:
+            f.write(svg)
+    if 'png' in formats:
+        page.image(scale).save(name + '.png')
+    return index, svg
+
+
+def write_pdf(path, pages):
+    '''
+    Assemble les SVG `pages` dans un PDF vectoriel, une page par SVG
+    '''
+    from PySide6.QtCore import QSizeF, QMarginsF, QByteArray
+    from PySide6.QtGui import QPdfWriter, QPainter, QPageSize, QPageLayout
+    from PySide6.QtSvg import QSvgRenderer
+
+    writer = QPdfWriter(path)
+    writer.setResolution(72)
+    writer.setCreator('Lenses')
+    painter = None
+    for i, svg in enumerate(pages):
+        with instrumentation.measure('cheatsheet', 'svg_load'):
+            renderer = QSvgRenderer(QByteArray(svg))
+        size = renderer.defaultSize()
+        layout = QPageLayout(QPageSize(QSizeF(size.width(), size.height()), QPageSize.Point),
+                             QPageLayout.Portrait, QMarginsF(0, 0, 0, 0))
+        writer.setPageLayout(layout)
+        if painter is None:
+            painter = QPainter(writer)
+        else:
+            writer.newPage()
+        renderer.render(painter)
+    if painter is not None:
+        painter.end()
+
+
+def export(configs, out_dir, formats=('png', 'svg', 'pdf'), jobs=None, scale=1.0):
+    '''
+    Exporte une page par configuration dans `out_dir` ; le PDF multipage est
+    écrit dans `out_dir/cheatsheet.pdf`
+    '''
+    os.makedirs(out_dir, exist_ok=True)
+    page_formats = tuple(f for f in formats if f != 'pdf')
+    pages = [None] * len(configs)
+
+    # Les processus sont démarrés avant toute initialisation de Qt dans le
+    # processus principal
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=context, initializer=_init_worker) as pool:
+        futures = [pool.submit(render_page, i, config, out_dir, page_formats, scale)
+                   for i, config in enumerate(configs)]
+        for future in futures:
+            index, svg = future.result()
+            pages[index] = svg
+
+    if 'pdf' in formats:
+        _init_worker()
+        write_pdf(os.path.join(out_dir, 'cheatsheet.pdf'), pages)
+    return pages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-o', '--output', required=True, help='dossier de sortie')
+    parser.add_argument('--constants', default=os.path.join(APPDIR, 'constants.json'))
+    parser.add_argument('--configs', help='fichier JSON contenant une liste de configurations')
+    parser.add_argument('--fnumber', type=float, default=8.0)
+    parser.add_argument('--distance', type=float, default=3.0, help='distance de mise au point (m)')
+    parser.add_argument('--confusion', default='DIGITAL', help='DIGITAL, ZEISS ou diamètre en mm')
+    parser.add_argument('--formats', nargs='+', choices=('png', 'svg', 'pdf'), default=('png', 'svg', 'pdf'))
+    parser.add_argument('--scale', type=float, default=2.0, help='facteur de résolution des PNG')
+    parser.add_argument('--jobs', type=int, default=None, help='nombre de processus (défaut : nombre de coeurs)')
+    args = parser.parse_args(argv)
+
+    confusion = args.confusion if args.confusion.upper() in optics.CONFUSION_PRESETS else float(args.confusion)
+    if args.configs:
+        with open(args.configs, 'rt', encoding='utf-8') as f:
+            configs = json.load(f)
+    else:
+        sensors, lenses = load_constants(args.constants)
+        configs = configurations(sensors, lenses, args.fnumber, args.distance, confusion)
+
+    export(configs, args.output, args.formats, args.jobs, args.scale)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
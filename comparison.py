@@ -0,0 +1,208 @@
+'''
+Comparaison côte à côte de plusieurs configurations boîtier/objectif/ouverture.
+
+Toutes les lignes partagent le catalogue, ses index de recherche et un même
+cache de rendus (rendus de FNumberBar et FovDisplay, calques d'échelle de
+DofBar) ; chaque ligne a son propre `model.CameraModel`, de sorte que la
+modification d'une ligne ne redessine pas les autres.
+'''
+from PySide6.QtCore import Qt, Slot
+from PySide6.QtWidgets import (
+    QWidget, QFrame, QLabel, QGridLayout, QHBoxLayout, QVBoxLayout,
+    QDoubleSpinBox, QPushButton, QScrollArea
+)
+
+import optics
+from catalog import CatalogIndex
+from catalogwidgets import CatalogComboBox
+from model import CameraModel
+from mywidgets import FovDisplay, FNumberBar, DofBar
+from rendercache import PixmapCache
+
+
+class ConfigurationRow(QFrame):
+    '''
+    Une configuration : capteur, objectif, focale et les trois widgets, reliés
+    à un `CameraModel` propre à la ligne
+    '''
+
+    def __init__(self, sensors, lenses, sensor_index, lens_index, cache, parent=None):
+        super().__init__(parent)
+        self.setFrameShape(QFrame.StyledPanel)
+        self._sensors = sensors
+        self._lenses = lenses
+        self._custom_lens = len(lenses) - 1 # dernière entrée : focale personnalisée
+
+        self.model = CameraModel(self)
+
+        self.combo_sensors = CatalogComboBox(sensors.keys(), self, index=sensor_index)
+        self.combo_sensors.entryChanged.connect(self.on_sensor_changed)
+        self.combo_lenses = CatalogComboBox(lenses.keys(), self, index=lens_index)
+        self.combo_lenses.entryChanged.connect(self.on_lens_changed)
+        self.focal_spin = QDoubleSpinBox(self)
+        self.focal_spin.setRange(1.0, 1000.0)
+        self.focal_spin.setSuffix(' mm')
+        self.focal_spin.setDecimals(1)
+        self.focal_spin.valueChanged.connect(self.on_focal_changed)
+        self.label_dof = QLabel(self)
+
+        self.dof_bar = DofBar(self)
+        self.fnumber_bar = FNumberBar(self)
+        self.fov_view = FovDisplay(self)
+        self.dof_bar.setRenderCache(cache)
+        self.fnumber_bar.setRenderCache(cache)
+        self.fov_view.setRenderCache(cache)
+        for widget in (self.dof_bar, self.fnumber_bar, self.fov_view):
+            widget.setModel(self.model)
+        self.dof_bar.valueChanged.connect(self.on_distance_changed)
+        self.fnumber_bar.valueChanged.connect(self.on_fnumber_changed)
+        self.model.changed.connect(self.on_model_changed)
+
+        gLayout = QGridLayout(self)
+        gLayout.addWidget(self.combo_sensors, 0, 0)
+        gLayout.addWidget(self.combo_lenses, 0, 1)
+        gLayout.addWidget(self.focal_spin, 0, 2)
+        gLayout.addWidget(self.label_dof, 0, 3)
+        gLayout.addWidget(self.dof_bar, 1, 0, 1, 3)
+        gLayout.addWidget(self.fnumber_bar, 2, 0, 1, 3)
+        gLayout.addWidget(self.fov_view, 1, 3, 3, 1)
+        gLayout.setRowStretch(3, 1)
+        gLayout.setColumnStretch(0, 2)
+        gLayout.setColumnStretch(1, 2)
+        gLayout.setColumnStretch(2, 1)
+
+    def configuration(self):
+        return dict(
+            sensor=self.combo_sensors.currentIndex(),
+            lens=self.combo_lenses.currentIndex(),
+            focal=self.focal_spin.value(),
+            f_number=self.fnumber_bar.f_number,
+            distance=self.dof_bar.focusing_distance,
+        )
+
+    def setConfiguration(self, sensor=0, lens=0, focal=None, f_number=8.0, distance=3.0):
+        with self.model.batch():
+            self.combo_sensors.setCurrentIndex(sensor)
+            self.on_sensor_changed(self.combo_sensors.currentEntry())
+            if focal is not None:
+                self.focal_spin.blockSignals(True)
+                self.focal_spin.setValue(focal)
+                self.focal_spin.blockSignals(False)
+            self.combo_lenses.setCurrentIndex(lens)
+            self.on_lens_changed(self.combo_lenses.currentEntry())
+            self.fnumber_bar.setFNumber(f_number)
+        # La distance minimale dépend de la focale et de l'ouverture
+        self.model.flush()
+        self.dof_bar.setFocusDistance(distance)
+        self.model.flush()
+
+    @Slot(object)
+    def on_model_changed(self, fields):
+        dof = self.model.focusing_distance_far - self.model.focusing_distance_near
+        formatted_dof = optics.format_distance_m(dof, infinity_limit=999.5)
+        self.label_dof.setText('→ PdC : {}'.format('infinie' if formatted_dof == 'inf' else formatted_dof))
+
+    @Slot(str)
+    def on_sensor_changed(self, key):
+        w, h = self._sensors[key]
+        self.model.set(sensor_size=(w, h), confusion=optics.confusion_size(w, h))
+
+    @Slot(str)
+    def on_lens_changed(self, key):
+        if self.combo_lenses.currentIndex() == self._custom_lens:
+            focal = self.focal_spin.value()
+        else:
+            focal = self._lenses[key]
+            self.focal_spin.blockSignals(True)
+            self.focal_spin.setValue(float(focal))
+            self.focal_spin.blockSignals(False)
+        self.model.setFocalLength(focal)
+
+    @Slot(float)
+    def on_focal_changed(self, focal):
+        self.combo_lenses.blockSignals(True)
+        self.combo_lenses.setCurrentIndex(self._custom_lens)
+        self.combo_lenses.blockSignals(False)
+        self.model.setFocalLength(focal)
+
+    @Slot(int)
+    def on_fnumber_changed(self, index):
+        self.model.setFNumber(self.fnumber_bar.f_number)
+
+    @Slot(int)
+    def on_distance_changed(self, index):
+        self.model.setFocusDistance(self.dof_bar.focusing_distance)
+
+
+class ComparisonWindow(QWidget):
+    '''
+    Fenêtre de `count` configurations (de 1 à `MAX_ROWS`) ; une nouvelle ligne
+    reprend la configuration de la dernière.
+
+    `sensor_index` et `lens_index` sont les `CatalogIndex` du catalogue, par
+    exemple ceux des listes de la fenêtre principale ; ils sont construits si
+    absents.
+    '''
+    MAX_ROWS = 8
+
+    def __init__(self, sensors, lenses, count=4, configuration=None,
+                 sensor_index=None, lens_index=None, cache=None, parent=None):
+        super().__init__(parent, Qt.Window)
+        self.setWindowTitle('Lenses - comparaison')
+        self.resize(900, 700)
+
+        self._sensors = sensors
+        self._lenses = lenses
+        self._sensor_index = sensor_index or CatalogIndex(list(sensors))
+        self._lens_index = lens_index or CatalogIndex(list(lenses))
+        self.render_cache = cache if cache is not None else PixmapCache(max_bytes=8*1024*1024)
+        self.rows = list()
+
+        vLayout = QVBoxLayout(self)
+        hLayout_buttons = QHBoxLayout()
+        self.add_button = QPushButton('Ajouter une configuration', self)
+        self.add_button.clicked.connect(self.add_row)
+        self.remove_button = QPushButton('Retirer la dernière', self)
+        self.remove_button.clicked.connect(self.remove_row)
+        hLayout_buttons.addWidget(self.add_button)
+        hLayout_buttons.addWidget(self.remove_button)
+        hLayout_buttons.addStretch(1)
+        vLayout.addLayout(hLayout_buttons)
+
+        scroll = QScrollArea(self)
+        scroll.setWidgetResizable(True)
+        rows_widget = QWidget(scroll)
+        self._rows_layout = QVBoxLayout(rows_widget)
+        self._rows_layout.addStretch(1)
+        scroll.setWidget(rows_widget)
+        vLayout.addWidget(scroll)
+
+        for _ in range(count):
+            self.add_row(configuration)
+
+    @Slot()
+    def add_row(self, configuration=None):
+        if len(self.rows) >= self.MAX_ROWS:
+            return None
+        if not configuration:
+            configuration = self.rows[-1].configuration() if self.rows else dict()
+        row = ConfigurationRow(self._sensors, self._lenses, self._sensor_index, self._lens_index,
+                               self.render_cache, self)
+        row.setConfiguration(**configuration)
+        self._rows_layout.insertWidget(len(self.rows), row)
+        self.rows.append(row)
+        self._update_buttons()
+        return row
+
+    @Slot()
+    def remove_row(self):
+        if len(self.rows) <= 1:
+            return
+        row = self.rows.pop()
+        self._rows_layout.removeWidget(row)
+        row.deleteLater()
+        self._update_buttons()
+
+    def _update_buttons(self):
+        self.add_button.setEnabled(len(self.rows) < self.MAX_ROWS)
+        self.remove_button.setEnabled(len(self.rows) > 1)
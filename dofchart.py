@@ -0,0 +1,283 @@
+'''
+Courbes de netteté en fonction de la distance de mise au point : limites
+proche et lointaine (sur l'échelle des distances de `DofBar`) et profondeur
+de champ (échelle logarithmique), pour une ou plusieurs ouvertures.
+
+Chaque courbe est calculée par numpy sur l'échelle `FocusScale`, réduite à
+au plus deux points par colonne de pixels et gardée en cache sous forme d'un
+seul QPainterPath, construit sans boucle Python ; seules les courbes dont
+les paramètres ont changé sont recalculées.
+'''
+import math
+
+import numpy
+
+from PySide6.QtCore import Qt, QByteArray, QDataStream, QPointF, QRectF, QSize
+from PySide6.QtGui import QPainter, QPainterPath, QPen, QColor, QFont, QPixmap
+from PySide6.QtWidgets import QWidget, QSizePolicy
+
+import optics
+import instrumentation
+from mywidgets import DofBar, ModelView, FONT_FAMILY, SCALE_MARGIN
+
+QUANTITIES = ('near', 'far', 'dof')
+COLORS = dict(near='#0066c5', far='#0066c5', dof='#ff6a25')
+
+# Enregistrement d'un élément de QPainterPath dans un QDataStream
+_ELEMENT = numpy.dtype([('type', '<i4'), ('x', '<f8'), ('y', '<f8')])
+
+
+def path_from_arrays(x, y):
+    '''
+    QPainterPath reliant les points (x, y), construit d'un bloc à partir de
+    sa représentation binaire dans un QDataStream
+    '''
+    # Nombre d'éléments, éléments, début de la sous-figure courante (cStart),
+    # règle de remplissage
+    data = numpy.zeros(len(x)*_ELEMENT.itemsize + 12, dtype=numpy.uint8)
+    data[:4].view('<i4')[0] = len(x)
+    elements = data[4:-8].view(_ELEMENT)
+    elements['type'][1:] = 1 # MoveToElement puis LineToElement
+    elements['x'] = x
+    elements['y'] = y
+    data[-8:].view('<i4')[:] = (0, int(Qt.OddEvenFill.value))
+
+    path = QPainterPath()
+    stream = QDataStream(QByteArray(data.tobytes()))
+    # Format fixé explicitement : version, ordre des octets, réels en float64
+    stream.setVersion(QDataStream.Qt_6_0)
+    stream.setByteOrder(QDataStream.LittleEndian)
+    stream.setFloatingPointPrecision(QDataStream.DoublePrecision)
+    stream >> path
+    return path
+
+
+def decimate(x, y):
+    '''
+    Réduit des courbes (abscisses `x` croissantes en pixels, communes aux
+    lignes de `y`) à leurs valeurs extrêmes dans chaque colonne de pixels,
+    dans l'ordre de parcours : au plus deux points par colonne, sans changer
+    le tracé
+    '''
+    columns = numpy.floor(x)
+    starts = numpy.flatnonzero(numpy.concatenate(([True], columns[1:] != columns[:-1])))
+    if 2*len(starts) >= len(x):
+        return x, y
+    ends = numpy.append(starts[1:], len(x)) - 1
+    low = numpy.minimum.reduceat(y, starts, axis=-1)
+    high = numpy.maximum.reduceat(y, starts, axis=-1)
+    rising = y[..., ends] >= y[..., starts]
+    xs = numpy.repeat(columns[starts] + 0.5, 2)
+    ys = numpy.empty(y.shape[:-1] + (2*len(starts),))
+    ys[..., 0::2] = numpy.where(rising, low, high)
+    ys[..., 1::2] = numpy.where(rising, high, low)
+    return xs, ys
+
+
+class DofChart(ModelView, QWidget):
+    '''
+    Limites de netteté et profondeur de champ selon la distance de mise au
+    point, pour l'ouverture courante et les ouvertures de `setFNumbers()`.
+    L'axe horizontal suit les positions d'un `DofBar` de même largeur.
+    '''
+    MARGIN = SCALE_MARGIN
+    PADDING = 6
+    OVERSAMPLING = 4 # points calculés par position de DofBar
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.setSizePolicy(QSizePolicy.MinimumExpanding, QSizePolicy.Fixed)
+        self.setFixedHeight(160)
+        self.setMinimumWidth(300)
+
+        self._focal_length = float(24)
+        self._confusion = float(0.015)
+        self._f_number = 8.0
+        self._focusing_distance = float(3.0)
+        self._f_numbers = ()
+        self._focus_scale = None
+
+        # (ouverture, grandeur) -> (paramètres, QPainterPath)
+        self._paths = dict()
+        self._layer = None
+        self._layer_key = None
+
+    @property
+    def focus_scale(self):
+        if self._focus_scale is None:
+            self._focus_scale = DofBar.default_focus_scale()
+        return self._focus_scale
+
+    def setFocusScale(self, scale):
+        self._focus_scale = scale
+        self._paths.clear()
+        self.update()
+
+    @property
+    def f_numbers(self):
+        return self._f_numbers
+
+    def setFNumbers(self, f_numbers):
+        '''
+        Ouvertures superposées à l'ouverture courante
+        '''
+        self._f_numbers = tuple(float(f) for f in f_numbers)
+        self.update()
+
+    def setFocalLength(self, f):
+        self._focal_length = float(f)
+        self.update()
+
+    def setConfusionSize(self, size):
+        self._confusion = float(size)
+        self.update()
+
+    def setFNumber(self, f):
+        self._f_number = float(f)
+        self.update()
+
+    def setFocusDistance(self, d):
+        self._focusing_distance = float(d)
+        self.update()
+
+    def _on_model_changed(self, fields):
+        model = self._model
+        self._focal_length = float(model.focal_length)
+        self._confusion = float(model.confusion_size)
+        self._f_number = float(model.f_number)
+        self._focusing_distance = float(model.focusing_distance)
+        self.update()
+
+    def _plot_rect(self):
+        d_width = self.width() - 1 - 2*self.MARGIN
+        return QRectF(self.MARGIN, self.PADDING, d_width, self.height() - 1 - 2*self.PADDING)
+
+    def _series_key(self):
+        '''
+        Paramètres dont dépendent toutes les courbes
+        '''
+        scale = self.focus_scale
+        return (self._focal_length, self._confusion, self.width(), self.height(),
+                scale.origin, scale.max_m, scale.steps)
+
+    @instrumentation.timed('raster')
+    def _update_paths(self, f_numbers):
+        '''
+        Recalcule en une passe les courbes des ouvertures `f_numbers` dont les
+        paramètres ont changé, et oublie celles qui ne sont plus affichées
+        '''
+        key = self._series_key()
+        wanted = {(f, quantity) for f in f_numbers for quantity in QUANTITIES}
+        for series in set(self._paths) - wanted:
+            del self._paths[series]
+        stale = sorted({f for f, quantity in wanted if self._paths.get((f, quantity), (None,))[0] != key})
+        if not stale:
+            return
+
+        scale = self.focus_scale
+        rect = self._plot_rect()
+        positions = numpy.linspace(0.0, 1.0, (scale.steps - 1) * self.OVERSAMPLING + 1)
+        distances = scale.scaleout(positions)
+        # Pas de mise au point en deçà de la focale
+        first = int(numpy.searchsorted(distances, self._focal_length/1000, side='right'))
+        positions, distances = positions[first:], distances[first:]
+        near, far = optics.dof_grid(self._focal_length, self._confusion, stale, distances)
+
+        low, high = numpy.log10(optics.DOF_RANGE)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            dof = (numpy.log10(far - near) - low) / (high - low)
+        values = dict(near=scale.scalein(near), far=scale.scalein(far), dof=dof)
+
+        x = rect.left() + positions * rect.width()
+        for quantity, v in values.items():
+            v = numpy.clip(numpy.nan_to_num(v, nan=1.0, posinf=1.0, neginf=0.0), 0.0, 1.0)
+            xs, ys = decimate(x, rect.bottom() - v * rect.height())
+            for f, row in zip(stale, ys):
+                self._paths[(f, quantity)] = (key, path_from_arrays(xs, row))
+
+    @instrumentation.timed('paint')
+    def paintEvent(self, e):
+        rect = self._plot_rect()
+        x = rect.left() + float(self.focus_scale.scalein(self._focusing_distance)) * rect.width()
+
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self._curves())
+        # Distance de mise au point courante
+        painter.setPen(QPen(QColor('red'), 1.0))
+        painter.drawLine(QPointF(x, rect.top() + 1), QPointF(x, rect.bottom() - 1))
+        painter.end()
+
+    def _curves(self):
+        '''
+        Calque des axes et des courbes, redessiné seulement si les courbes,
+        l'ouverture courante, les ouvertures superposées ou le dpr ont changé
+        '''
+        current = self._f_number
+        others = [f for f in self._f_numbers if f != current]
+        self._update_paths(others + [current])
+        key = (self._series_key(), current, tuple(others), self.devicePixelRatioF())
+        if self._layer_key != key:
+            self._layer = self._render_curves(current, others)
+            self._layer_key = key
+        return self._layer
+
+    @instrumentation.timed('raster')
+    def _render_curves(self, current, others):
+        dpr = self.devicePixelRatioF()
+        pixmap = QPixmap(math.ceil(self.width()*dpr), math.ceil(self.height()*dpr))
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(Qt.transparent)
+        rect = self._plot_rect()
+
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.fillRect(rect, QColor('white'))
+        self._draw_axes(painter, rect)
+
+        painter.setClipRect(rect)
+        painter.setBrush(Qt.NoBrush)
+        for quantity in QUANTITIES:
+            color = QColor(COLORS[quantity])
+            color.setAlpha(70)
+            painter.setPen(QPen(color, 1.0))
+            for f in others:
+                painter.drawPath(self._paths[(f, quantity)][1])
+        for quantity in QUANTITIES:
+            pen = QPen(QColor(COLORS[quantity]), 2.0)
+            if quantity == 'dof':
+                pen.setStyle(Qt.DashLine)
+            painter.setPen(pen)
+            painter.drawPath(self._paths[(current, quantity)][1])
+        painter.setClipping(False)
+
+        painter.setPen(QPen(QColor('#888888'), 1.0))
+        painter.drawRect(rect)
+        painter.end()
+        return pixmap
+
+    def _draw_axes(self, painter, rect):
+        '''
+        Graduations : distances à gauche (limites), profondeur de champ à droite
+        '''
+        scale = self.focus_scale
+        font = QFont(FONT_FAMILY)
+        font.setPixelSize(9)
+        painter.setFont(font)
+
+        for d, text in ((0.5, '50 cm'), (1, '1 m'), (10, '10 m')):
+            y = rect.bottom() - float(scale.scalein(d)) * rect.height()
+            painter.setPen(QPen(QColor('#e0e0e0'), 1.0))
+            painter.drawLine(QPointF(rect.left(), y), QPointF(rect.right(), y))
+            painter.setPen(QColor(COLORS['near']))
+            painter.drawText(QPointF(rect.left() + 3, y - 2), text)
+
+        low, high = numpy.log10(optics.DOF_RANGE)
+        painter.setPen(QColor(COLORS['dof']))
+        for exponent, text in ((-2, '1 cm'), (0, '1 m'), (2, '100 m')):
+            y = rect.bottom() - (exponent - low) / (high - low) * rect.height()
+            width = painter.fontMetrics().horizontalAdvance(text)
+            painter.drawText(QPointF(rect.right() - 3 - width, y - 2), text)
+
+    def sizeHint(self):
+        return QSize(400, 160)
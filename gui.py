@@ -1,20 +1,28 @@
 import os
-import json
 import logging
 from logging.handlers import RotatingFileHandler
 
-import numpy
+import instrumentation
+instrumentation.startup_mark('import gui')
 
-from PySide6.QtCore import QSettings, Slot, QSize, QPoint
+from PySide6.QtCore import Qt, QObject, QEvent, QSettings, Slot, QSize, QPoint, QTimer, QSignalBlocker
 from PySide6.QtGui import QAction
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QLabel, QHBoxLayout, QVBoxLayout, QSpacerItem,
     QSizePolicy, QGridLayout, QComboBox,
     QDoubleSpinBox, QMenuBar, QMenu, QMessageBox, QApplication,
-    QStatusBar
+    QStatusBar, QFileDialog, QCheckBox, QPushButton, QDockWidget
 )
 
 from mywidgets import FovDisplay, FNumberBar, DofBar   
+import optics
+from catalog import load_catalog
+from catalogwidgets import CatalogComboBox
+from model import CameraModel
+from autosave import Autosaver
+import asynclog
+
+instrumentation.startup_mark('gui importé')
 
 __version__ = '1.0.0'
 
@@ -22,39 +30,147 @@ APPDIR = os.path.dirname(os.path.abspath(os.path.realpath(__file__)))
 
 # Log
 logger = logging.getLogger('MyLens')
-logger.setLevel(logging.DEBUG)
-formatter = logging.Formatter('%(asctime)s | %(levelname)s | %(message)s', '%d/%m/%Y %H:%M:%S')
-# Handler vers fichier :
-file_handler = RotatingFileHandler(os.path.join(APPDIR, 'activity.log'), 'a', 1000000, 1, encoding='utf-8')
-file_handler.setLevel(logging.DEBUG)
-file_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
-# Handler vers console :
-stream_handler = logging.StreamHandler()
-stream_handler.setLevel(logging.DEBUG)
-logger.addHandler(stream_handler)
-
-try:
-    with open('constants.json', 'rt', encoding='utf-8') as f:
-        json_data = json.load(f)
-        SENSOR_SIZES = json_data['SENSOR_SIZES']
-        LENS_FOCALS = json_data['LENS_FOCALS']
-except Exception as e:
-    logger.error(str(e))
-    raise
+log_listener = None
+
+# Catalogues, chargés par `load_catalogs()`
+SENSOR_SIZES = None
+LENS_FOCALS = None
+
+
+def setup_logging():
+    '''
+    Journalisation vers activity.log et la console, écrite dans un fil séparé
+    par une file bornée
+    '''
+    global log_listener
+    if log_listener is not None:
+        return log_listener
+    logger.setLevel(logging.DEBUG)
+    formatter = logging.Formatter('%(asctime)s | %(levelname)s | %(message)s', '%d/%m/%Y %H:%M:%S')
+    # Handler vers fichier :
+    file_handler = RotatingFileHandler(os.path.join(APPDIR, 'activity.log'), 'a', 1000000, 1, encoding='utf-8')
+    file_handler.setLevel(logging.DEBUG)
+    file_handler.setFormatter(formatter)
+    # Handler vers console :
+    stream_handler = logging.StreamHandler()
+    stream_handler.setLevel(logging.DEBUG)
+    log_listener = asynclog.attach(logger, (file_handler, stream_handler))
+    return log_listener
+
+
+def load_catalogs():
+    '''
+    Charge (une seule fois) les capteurs et objectifs de constants.json
+    '''
+    global SENSOR_SIZES, LENS_FOCALS
+    if SENSOR_SIZES is None:
+        try:
+            SENSOR_SIZES, LENS_FOCALS = load_catalog(os.path.join(APPDIR, 'constants.json'))
+        except Exception as e:
+            logger.error(str(e))
+            raise
+        instrumentation.startup_mark('catalogue')
+    return SENSOR_SIZES, LENS_FOCALS
+
+
+class FirstPaintTracer(QObject):
+    '''
+    Enregistre le jalon de démarrage « <classe> peint » à la fin du premier
+    affichage de chacun des widgets observés, puis `done` une fois tous
+    affichés
+    '''
+
+    def __init__(self, widgets, done=None, parent=None):
+        super().__init__(parent)
+        self._waiting = set(widgets)
+        self._done = done
+        for widget in self._waiting:
+            widget.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and obj in self._waiting:
+            self._waiting.discard(obj)
+            obj.removeEventFilter(self)
+            # Jalon noté au retour dans la boucle d'événements, une fois
+            # l'affichage terminé
+            name = type(obj).__name__
+            QTimer.singleShot(0, self, lambda: self._painted(name))
+        return False
+
+    def _painted(self, name):
+        instrumentation.startup_mark('{} peint'.format(name))
+        if not self._waiting and self._done is not None:
+            self._done()
+            self._done = None
 
 
 class MainWindow(QMainWindow):
-
-    def __init__(self, *args, **kwargs):
+    '''
+    Fenêtre principale.
+
+    Avec `deferred=True`, la première image est affichée avec les valeurs par
+    défaut et les listes du catalogue vides ; le remplissage de ces listes, la
+    restauration de la session, le solveur et la sauvegarde automatique
+    (`initSession()`) suivent, depuis la boucle d'événements,
+    une fois les trois widgets affichés, ou au plus tard `SESSION_DELAY` ms
+    après la création (fenêtre réduite, widget jamais affiché).
+    `initialized` devient alors vrai.
+    '''
+    SESSION_DELAY = 250 # ms
+
+    def __init__(self, *args, deferred=False, **kwargs):
         super().__init__(*args, **kwargs)
+        instrumentation.startup_mark('MainWindow')
+        load_catalogs()
+        self.initialized = False
+        self._deferred = deferred
+
+        self.model = CameraModel(self)
 
         self.initUi()
-        self._sensor_size = (1.0, 1.0)
-        self.set_confusion_dict()
-        self.readSettings()
-        self.on_sensor_changed(self.combo_sensors.currentText())
+        instrumentation.startup_mark('initUi')
+        self._sensor_size = self.model.sensor_size
         self.set_confusion_dict()
+        self.model.changed.connect(self.on_model_changed)
+        self._first_paint_tracer = FirstPaintTracer((self.dof_bar, self.fnumber_bar, self.fov_view),
+                                                    self._on_first_paint, self)
+        self.readSettings(camera=False)
+        if deferred:
+            QTimer.singleShot(self.SESSION_DELAY, self, self.initSession)
+        else:
+            self.initSession()
+
+    @Slot()
+    def initSession(self):
+        '''
+        Restaure la session et démarre la sauvegarde automatique
+        '''
+        if self.initialized:
+            return
+        if self._deferred:
+            self.combo_sensors.setCatalog(SENSOR_SIZES.keys())
+            self.combo_lenses.setCatalog(LENS_FOCALS.keys())
+        self.readSettings(geometry=False)
+        self.on_sensor_changed(self.combo_sensors.currentEntry())
+        self.model.flush()
+        instrumentation.startup_mark('readSettings')
+
+        # Sauvegarde automatique, différée, de toute modification
+        self.autosaver = Autosaver(self.settings_snapshot, self.write_settings, parent=self)
+        for signal in (self.model.changed, self.combo_sensors.currentIndexChanged,
+                       self.combo_lenses.currentIndexChanged, self.combo_confusions.currentIndexChanged):
+            signal.connect(self.autosaver.schedule)
+
+        self.update_solver()
+        self.initialized = True
+        instrumentation.startup_mark('session')
+        if self._deferred:
+            logger.info('Session restaurée (ms) : {}'.format(instrumentation.startup_summary()))
+
+    def _on_first_paint(self):
+        if self._deferred:
+            QTimer.singleShot(0, self, self.initSession)
+        logger.info('Démarrage (ms) : {}'.format(instrumentation.startup_summary()))
 
     def initUi(self):
         self.setWindowTitle('Lenses')
@@ -78,16 +194,15 @@ class MainWindow(QMainWindow):
 
         label1 = QLabel('Caméra/capteur :', main_page)
         gLayout_camera.addWidget(label1, 0, 0)
-        self.combo_sensors = QComboBox(main_page)
-        self.combo_sensors.addItems(SENSOR_SIZES.keys())
-        self.combo_sensors.currentTextChanged.connect(self.on_sensor_changed)
+        # Listes remplies par `initSession()` en mode différé
+        self.combo_sensors = CatalogComboBox(None if self._deferred else SENSOR_SIZES.keys(), main_page)
+        self.combo_sensors.entryChanged.connect(self.on_sensor_changed)
         gLayout_camera.addWidget(self.combo_sensors, 1, 0)
 
         label2 = QLabel('Objectif :', main_page)
         gLayout_camera.addWidget(label2, 0, 1)
-        self.combo_lenses = QComboBox(main_page)
-        self.combo_lenses.addItems(LENS_FOCALS.keys())
-        self.combo_lenses.currentTextChanged.connect(self.on_lens_changed)
+        self.combo_lenses = CatalogComboBox(None if self._deferred else LENS_FOCALS.keys(), main_page)
+        self.combo_lenses.entryChanged.connect(self.on_lens_changed)
         gLayout_camera.addWidget(self.combo_lenses, 1, 1)
 
         label3 = QLabel('Distance focale :', main_page)
@@ -128,20 +243,56 @@ class MainWindow(QMainWindow):
         label7 = QLabel('Distance de mise au point :', main_page)
         vLayout_main.addWidget(label7)
         self.dof_bar = DofBar(main_page)
+        self.dof_bar.setModel(self.model)
         self.dof_bar.valueChanged.connect(self.on_distance_changed)
         vLayout_main.addWidget(self.dof_bar)
         self.label_dof = QLabel('→ profondeur de champ : ND', main_page)
         vLayout_main.addWidget(self.label_dof)
+        # Courbes de netteté selon la distance : créées au premier affichage
+        self.dof_chart = None
+        self._chart_f_numbers = ()
+        self._vLayout_main = vLayout_main
+
+        # Ouverture et mise au point pour une zone nette donnée
+        hLayout_solver = QHBoxLayout()
+        hLayout_solver.addWidget(QLabel('Zone nette souhaitée : de', main_page))
+        self.solver_near_spin = QDoubleSpinBox(main_page)
+        self.solver_near_spin.setRange(0.01, 1000.0)
+        self.solver_near_spin.setSuffix(' m')
+        self.solver_near_spin.setDecimals(2)
+        self.solver_near_spin.setValue(2.0)
+        self.solver_near_spin.valueChanged.connect(self.update_solver)
+        hLayout_solver.addWidget(self.solver_near_spin)
+        hLayout_solver.addWidget(QLabel('à', main_page))
+        self.solver_far_spin = QDoubleSpinBox(main_page)
+        self.solver_far_spin.setRange(0.01, 1000.0)
+        self.solver_far_spin.setSuffix(' m')
+        self.solver_far_spin.setDecimals(2)
+        self.solver_far_spin.setValue(5.0)
+        self.solver_far_spin.valueChanged.connect(self.update_solver)
+        hLayout_solver.addWidget(self.solver_far_spin)
+        self.solver_infinity_check = QCheckBox('∞', main_page)
+        self.solver_infinity_check.toggled.connect(self.solver_far_spin.setDisabled)
+        self.solver_infinity_check.toggled.connect(self.update_solver)
+        hLayout_solver.addWidget(self.solver_infinity_check)
+        self.label_solver = QLabel(main_page)
+        hLayout_solver.addWidget(self.label_solver, 1)
+        self.solver_button = QPushButton('Appliquer', main_page)
+        self.solver_button.clicked.connect(self.apply_solver)
+        hLayout_solver.addWidget(self.solver_button)
+        vLayout_main.addLayout(hLayout_solver)
 
         label8 = QLabel('Ouverture :', main_page)
         vLayout_main.addWidget(label8)
         self.fnumber_bar = FNumberBar(main_page)
+        self.fnumber_bar.setModel(self.model)
         self.fnumber_bar.valueChanged.connect(self.on_fnumber_changed)
         vLayout_main.addWidget(self.fnumber_bar)
 
         label6 = QLabel('Angle de champ :', main_page)
         vLayout_main.addWidget(label6)
         self.fov_view = FovDisplay(main_page)
+        self.fov_view.setModel(self.model)
         vLayout_main.addWidget(self.fov_view)
 
         vSpacer_helpBottom = QSpacerItem(20, 40, QSizePolicy.Minimum, QSizePolicy.Expanding)
@@ -150,6 +301,16 @@ class MainWindow(QMainWindow):
         hLayout_MainWindow.addWidget(main_page)
         self.setCentralWidget(centralwidget)
 
+        # ---------------------------------------------
+        # Carte de netteté (masquée par défaut, créée au premier affichage)
+        # ---------------------------------------------
+        self.heatmap_panel = None
+        self.heatmap_dock = QDockWidget('Carte de netteté', self)
+        self.heatmap_dock.setObjectName('heatmap_dock')
+        self.heatmap_dock.visibilityChanged.connect(self.on_heatmap_visibility_changed)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.heatmap_dock)
+        self.heatmap_dock.hide()
+
         # ---------------------------------------------
         # Menus
         # ---------------------------------------------
@@ -158,10 +319,42 @@ class MainWindow(QMainWindow):
         action_Quitter.setShortcut('Ctrl+Q')
         action_Quitter.triggered.connect(self.close)
         
+        action_Comparer = QAction('&Comparer des configurations...', self)
+        action_Comparer.triggered.connect(self.open_comparison)
+
         menu_Fichier = QMenu('&Fichier', menubar)
+        menu_Fichier.addAction(action_Comparer)
         menu_Fichier.addAction(action_Quitter)
 
+        action_Mesures = QAction('&Mesures de performance', self)
+        action_Mesures.setCheckable(True)
+        action_Mesures.toggled.connect(self.on_instrumentation_toggled)
+        action_EnregistrerMesures = QAction('&Enregistrer les mesures...', self)
+        action_EnregistrerMesures.triggered.connect(self.on_save_measures)
+        action_ReinitialiserMesures = QAction('&Réinitialiser les mesures', self)
+        action_ReinitialiserMesures.triggered.connect(instrumentation.reset)
+
+        action_Carte = self.heatmap_dock.toggleViewAction()
+        action_Carte.setText('&Carte de netteté')
+
+        action_Courbes = QAction('C&ourbes de netteté', self)
+        action_Courbes.setCheckable(True)
+        action_Courbes.toggled.connect(self.on_chart_toggled)
+        action_CourbesOuvertures = QAction('Courbes de &toutes les ouvertures', self)
+        action_CourbesOuvertures.setCheckable(True)
+        action_CourbesOuvertures.toggled.connect(self.on_chart_f_numbers_toggled)
+
+        menu_Affichage = QMenu('&Affichage', menubar)
+        menu_Affichage.addAction(action_Carte)
+        menu_Affichage.addAction(action_Courbes)
+        menu_Affichage.addAction(action_CourbesOuvertures)
+        menu_Affichage.addSeparator()
+        menu_Affichage.addAction(action_Mesures)
+        menu_Affichage.addAction(action_EnregistrerMesures)
+        menu_Affichage.addAction(action_ReinitialiserMesures)
+
         menubar.addAction(menu_Fichier.menuAction())
+        menubar.addAction(menu_Affichage.menuAction())
 
         self.setMenuBar(menubar)
 
@@ -172,20 +365,18 @@ class MainWindow(QMainWindow):
         self.setStatusBar(self.statusbar)
         self.statusbar.hide()
 
+        # Affichage des mesures de performance, rafraîchi deux fois par seconde
+        self._measures_timer = QTimer(self)
+        self._measures_timer.setInterval(500)
+        self._measures_timer.timeout.connect(self.show_measures)
+
     def _confusion_size(self, option='DIGITAL'):
         '''
         Retourne le diamètre du cercle de confusion pour une taille de capteur donnée.
         `sensor_size` : (l, h) en mm
         '''
-        # Diagonale capteur (mm)
         w, h = self._sensor_size
-        d = numpy.sqrt(w**2 + h**2)
-        # Cercle de confusion (mm)
-        if option.upper()=='ZEISS':
-            c = d/1730 # Formule de Zeiss (plus sévère)
-        else: # 'DIGITAL'
-            c = d/1442 # Valeur en photo numérique
-        return c # mm
+        return float(optics.confusion_size(w, h, option)) # mm
 
     def set_confusion_dict(self): # , sensor_size
         c1 = self._confusion_size(option='DIGITAL')
@@ -196,27 +387,16 @@ class MainWindow(QMainWindow):
             'Personnalisé...': 'CUSTOM'
         }
         keys = list(self._confusion_dict.keys())
+        # Libellés seuls : le cercle de confusion est appliqué par l'appelant
+        blocker = QSignalBlocker(self.combo_confusions)
         for i in range(self.combo_confusions.count()):
             self.combo_confusions.setItemText(i, keys[i])
+        blocker.unblock()
 
-    @staticmethod
-    def format_distance_m(m, infinity_limit=1e6):
-        abs_m = abs(m)
-        if 0<=abs_m<0.001 and abs_m<infinity_limit:
-            return ('{:0.3f} µm'.format(m*1e6))
-        elif 0.001<=abs_m<0.01 and abs_m<infinity_limit:
-            return ('{:0.3g} mm'.format(m*1000))
-        elif 0.01<abs_m<1 and abs_m<infinity_limit:
-            return ('{:0.3g} cm'.format(m*100))
-        elif 1<=abs_m<1000 and abs_m<infinity_limit:
-            return ('{:0.3g} m'.format(m))
-        elif 1000<=abs_m<infinity_limit:
-            return ('{:0.3g} km'.format(m/1000))
-        else:
-            return 'inf' if numpy.sign(m)==1 else '-inf'
+    format_distance_m = staticmethod(optics.format_distance_m)
 
     def _update_dof_string(self):
-        dof = self.dof_bar.focusing_distance_far - self.dof_bar.focusing_distance_near
+        dof = self.model.focusing_distance_far - self.model.focusing_distance_near
         formatted_dof = self.format_distance_m(dof, infinity_limit=999.5)
         if formatted_dof=='inf':
             text = '→ profondeur de champ : infinie'
@@ -225,23 +405,74 @@ class MainWindow(QMainWindow):
         self.label_dof.setText(text)
 
     def set_focal_length(self, focal):
-        self.fov_view.setFocalLength(focal)
-        self.dof_bar.setFocalLength(focal)
-        self._update_dof_string()
+        self.model.setFocalLength(focal)
     
     def set_confusion_size(self, size):
-        self.dof_bar.setConfusionSize(size)
+        self.model.setConfusionSize(size)
+
+    @Slot(object)
+    def on_model_changed(self, fields):
+        '''
+        Une seule mise à jour par série de modifications du modèle
+        '''
         self._update_dof_string()
-        self.fnumber_bar.setConfusionSize(size)
+        if fields & {'focal_length', 'confusion'}:
+            self.update_solver()
+
+    def solve_dof(self):
+        '''
+        Solution de `optics.solve_dof` pour la zone nette saisie, ou None si
+        la saisie n'est pas valide
+        '''
+        near = self.solver_near_spin.value()
+        far = float('inf') if self.solver_infinity_check.isChecked() else self.solver_far_spin.value()
+        if not near < far:
+            return None
+        return optics.solve_dof(near, far, self.model.focal_length, self.model.confusion_size)
+
+    @Slot()
+    def update_solver(self):
+        solution = self.solve_dof()
+        if solution is None:
+            text = '→ distances incohérentes'
+        elif solution.index is None:
+            text = '→ aucune ouverture ne suffit'
+        else:
+            text = '→ f/{:.2g} à {}'.format(optics.F_VALUES[solution.index],
+                                            self.format_distance_m(solution.focusing_distance))
+            if solution.diffraction_limited:
+                text += ' (diffraction)'
+        self.label_solver.setText(text)
+        self.solver_button.setEnabled(solution is not None and solution.index is not None)
+
+    @Slot()
+    def apply_solver(self):
+        solution = self.solve_dof()
+        if solution is None or solution.index is None:
+            return
+        self.fnumber_bar.setValue(solution.index)
+        self.model.flush()
+        self.dof_bar.setFocusDistance(solution.focusing_distance)
+        # valueChanged n'est pas émis si la position du slider ne change pas
+        self.model.setFocusDistance(self.dof_bar.focusing_distance)
 
     @Slot(str)
     def on_sensor_changed(self, key):
+        '''
+        Capteur et cercle de confusion prédéfini correspondant, appliqués au
+        modèle en une seule modification
+        '''
         self._sensor_size = tuple(SENSOR_SIZES[key])
-        self.fov_view.setSensorSize(self._sensor_size)
-        self.dof_bar.setSensorSize(self._sensor_size)
-        self._update_dof_string()
-        self.fnumber_bar.setSensorSize(self._sensor_size)
-        self.set_confusion_dict() # self._sensor_size
+        self.set_confusion_dict()
+        confusion_option = self._confusion_dict[self.combo_confusions.currentText()]
+        if confusion_option=='CUSTOM':
+            self.model.setSensorSize(self._sensor_size)
+            return
+        size = self._confusion_size(option=confusion_option)
+        self.confusion_spin.blockSignals(True)
+        self.confusion_spin.setValue(float(size*1000))
+        self.confusion_spin.blockSignals(False)
+        self.model.set(sensor_size=self._sensor_size, confusion=size)
     
     @Slot(str)
     def on_confusion_changed(self, key):
@@ -264,7 +495,7 @@ class MainWindow(QMainWindow):
 
     @Slot(str)
     def on_lens_changed(self, key):
-        if key=='' or key==list(LENS_FOCALS.keys())[-1]:
+        if key=='' or key==next(reversed(LENS_FOCALS)):
             focal = self.focal_spin.value()
         else:
             focal = LENS_FOCALS[key]
@@ -282,13 +513,86 @@ class MainWindow(QMainWindow):
 
     @Slot(int)
     def on_fnumber_changed(self, index):
-        self.dof_bar.setFNumber(self.fnumber_bar.f_number)
-        self._update_dof_string()
+        self.model.setFNumber(self.fnumber_bar.f_number)
 
     @Slot(int)
     def on_distance_changed(self, index):
-        self._update_dof_string()
-        self.fov_view.setFocusDistance(self.dof_bar.focusing_distance)
+        self.model.setFocusDistance(self.dof_bar.focusing_distance)
+
+    @Slot(bool)
+    def on_heatmap_visibility_changed(self, visible):
+        if visible and self.heatmap_panel is None:
+            from heatmap import HeatmapPanel
+
+            self.heatmap_panel = HeatmapPanel()
+            self.heatmap_panel.setModel(self.model)
+            self.heatmap_panel.setFocusScale(self.dof_bar.focus_scale)
+            self.heatmap_dock.setWidget(self.heatmap_panel)
+
+    @Slot(bool)
+    def on_chart_toggled(self, visible):
+        if visible and self.dof_chart is None:
+            from dofchart import DofChart
+
+            main_page = self.label_dof.parentWidget()
+            self.dof_chart = DofChart(main_page)
+            self.dof_chart.setModel(self.model)
+            self.dof_chart.setFocusScale(self.dof_bar.focus_scale)
+            self.dof_chart.setFNumbers(self._chart_f_numbers)
+            self._vLayout_main.insertWidget(self._vLayout_main.indexOf(self.label_dof) + 1, self.dof_chart)
+        if self.dof_chart is not None:
+            self.dof_chart.setVisible(visible)
+
+    @Slot(bool)
+    def on_chart_f_numbers_toggled(self, enabled):
+        self._chart_f_numbers = optics.F_TRUE_VALUES if enabled else ()
+        if self.dof_chart is not None:
+            self.dof_chart.setFNumbers(self._chart_f_numbers)
+
+    @Slot()
+    def open_comparison(self):
+        '''
+        Ouvre une fenêtre de comparaison partant de la configuration courante ;
+        elle partage le catalogue et ses index avec cette fenêtre
+        '''
+        from comparison import ComparisonWindow
+
+        configuration = dict(
+            sensor=self.combo_sensors.currentIndex(),
+            lens=self.combo_lenses.currentIndex(),
+            focal=self.focal_spin.value(),
+            f_number=self.fnumber_bar.f_number,
+            distance=self.dof_bar.focusing_distance,
+        )
+        window = ComparisonWindow(SENSOR_SIZES, LENS_FOCALS, configuration=configuration,
+                                  sensor_index=self.combo_sensors.index, lens_index=self.combo_lenses.index,
+                                  parent=self)
+        window.setAttribute(Qt.WA_DeleteOnClose)
+        window.show()
+
+    @Slot(bool)
+    def on_instrumentation_toggled(self, enabled):
+        instrumentation.set_enabled(enabled)
+        self.statusbar.setVisible(enabled)
+        if enabled:
+            self.show_measures()
+            self._measures_timer.start()
+        else:
+            self._measures_timer.stop()
+
+    @Slot()
+    def show_measures(self):
+        '''
+        Médiane/90e percentile (ms) de chaque mesure dans la barre d'état
+        '''
+        self.statusbar.showMessage(instrumentation.summary())
+
+    @Slot()
+    def on_save_measures(self):
+        path, _ = QFileDialog.getSaveFileName(self, 'Enregistrer les mesures', 'mesures.json', 'JSON (*.json)')
+        if path:
+            instrumentation.dump(path)
+            logger.info('Mesures de performance enregistrées dans {}'.format(path))
 
     def closeEvent(self, event):
         msg = 'Êtes-vous sûr de vouloir quitter ?'
@@ -300,7 +604,8 @@ class MainWindow(QMainWindow):
         closeMsg = closeMsg.exec()
 
         if closeMsg == QMessageBox.Yes:
-            self.writeSettings()
+            if self.initialized:
+                self.autosaver.stop()
             event.accept()
             logger.info('Fermeture de l’interface graphique.')
         else:
@@ -310,51 +615,89 @@ class MainWindow(QMainWindow):
         logger.info('Affichage de l’interface graphique.')
         event.accept()
 
-    def writeSettings(self):
+    def moveEvent(self, event):
+        super().moveEvent(event)
+        if hasattr(self, 'autosaver'):
+            self.autosaver.schedule()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if hasattr(self, 'autosaver'):
+            self.autosaver.schedule()
+
+    def settings_snapshot(self):
+        '''
+        État de la session à enregistrer (valeurs simples, comparables)
+        '''
+        return dict(
+            size=(self.width(), self.height()),
+            pos=(self.x(), self.y()),
+            sensor=self.combo_sensors.currentIndex(),
+            lens=self.combo_lenses.currentIndex(),
+            focal=self.focal_spin.value(),
+            confusion=self.combo_confusions.currentIndex(),
+            fnumber=self.fnumber_bar.f_number,
+            dof=self.dof_bar.focusing_distance,
+        )
+
+    @staticmethod
+    def write_settings(state):
+        '''
+        Écrit l'état `state` (voir `settings_snapshot`) ; peut être appelée
+        depuis un autre fil que celui de l'interface
+        '''
         settings = QSettings('MyLens', 'GUI')
 
         settings.beginGroup('MainWindow')
-        settings.setValue('size', self.size())
-        settings.setValue('pos', self.pos())
+        settings.setValue('size', QSize(*state['size']))
+        settings.setValue('pos', QPoint(*state['pos']))
         settings.endGroup()
         
         settings.beginGroup('CameraHelper')
-        settings.setValue('sensor', self.combo_sensors.currentIndex())
-        settings.setValue('lens', self.combo_lenses.currentIndex())
-        settings.setValue('focal', self.focal_spin.value())
-        settings.setValue('confusion', self.combo_confusions.currentIndex())
-        settings.setValue('fnumber', self.fnumber_bar.f_number)
-        settings.setValue('dof', self.dof_bar.focusing_distance)
+        settings.setValue('sensor', state['sensor'])
+        settings.setValue('lens', state['lens'])
+        settings.setValue('focal', state['focal'])
+        settings.setValue('confusion', state['confusion'])
+        settings.setValue('fnumber', state['fnumber'])
+        settings.setValue('dof', state['dof'])
         settings.endGroup()
+        settings.sync()
 
-    def readSettings(self):
+    def readSettings(self, geometry=True, camera=True):
         settings = QSettings('MyLens', 'GUI')
 
-        settings.beginGroup('MainWindow')
-        self.resize(settings.value('size', QSize(800, 600)))
-        self.move(settings.value('pos', QPoint(200, 200)))
-        settings.endGroup()
+        if geometry:
+            settings.beginGroup('MainWindow')
+            self.resize(settings.value('size', QSize(800, 600)))
+            self.move(settings.value('pos', QPoint(200, 200)))
+            settings.endGroup()
+        if not camera:
+            return
         
         settings.beginGroup('CameraHelper')
-        self.combo_sensors.setCurrentIndex(settings.value('sensor', 1))
-        focal_index = settings.value('lens', 1)
+        self.combo_sensors.setCurrentIndex(settings.value('sensor', 1, type=int))
+        focal_index = settings.value('lens', 1, type=int)
         focals = list(LENS_FOCALS.values())
         if focal_index>=len(focals):
             focal_index=len(focals)-1
         self.focal_spin.setValue(float(settings.value('focal', focals[focal_index])))
         self.combo_lenses.setCurrentIndex(focal_index)
-        self.combo_confusions.setCurrentIndex(settings.value('confusion', 1))
+        self.combo_confusions.setCurrentIndex(settings.value('confusion', 1, type=int))
         self.fnumber_bar.setFNumber(float(settings.value('fnumber', 5.6)))
+        # Les widgets doivent connaître la focale et l'ouverture pour borner la distance
+        self.model.flush()
         self.dof_bar.setFocusDistance(float(settings.value('dof', 3.5)))
         settings.endGroup()
 
 
 if __name__ == '__main__':
     import sys
+    setup_logging()
     app = QApplication(sys.argv)
     app.setStyle('fusion')
 
 
-    window = MainWindow()
+    # Première image au plus tôt, la session est restaurée ensuite
+    window = MainWindow(deferred=True)
     window.show()
     sys.exit(app.exec())
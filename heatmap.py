@@ -0,0 +1,272 @@
+'''
+Carte de la profondeur de champ (ou des limites de netteté) sur toute la
+grille ouvertures × distances de mise au point : les 25 ouvertures de
+`FNumberBar` en lignes, les 1000 positions de `DofBar` en colonnes.
+
+La grille est calculée en une seule passe numpy, convertie en couleurs par
+une table et affichée par un QImage qui partage la mémoire du tableau : ni
+copie, ni boucle Python par case.
+'''
+import numpy
+
+from PySide6.QtCore import QEvent, QPointF, QRectF, QSize, Slot
+from PySide6.QtGui import QImage, QPainter, QPen, QColor
+from PySide6.QtWidgets import QWidget, QComboBox, QLabel, QHBoxLayout, QVBoxLayout, QSizePolicy, QToolTip
+
+import optics
+import instrumentation
+from mywidgets import DofBar, ModelView, SCALE_MARGIN
+
+# Grandeurs affichables : libellé et légende
+QUANTITIES = {
+    'dof': ('Profondeur de champ', 'de 1 mm à 1 km (échelle logarithmique)'),
+    'near': ('Limite proche', "selon l'échelle des distances de mise au point"),
+    'far': ('Limite lointaine', "selon l'échelle des distances de mise au point"),
+}
+
+# Dégradé (position, (r, g, b)) des faibles aux grandes valeurs
+GRADIENT = (
+    (0.0, (0x00, 0x26, 0x4d)),
+    (0.4, (0x00, 0x66, 0xc5)),
+    (0.75, (0xff, 0xff, 0xff)),
+    (1.0, (0xff, 0x6a, 0x25)),
+)
+# Mise au point impossible
+OUT_OF_RANGE = 0xffdddddd
+
+
+def color_table(size=256):
+    '''
+    Table de `size` couleurs ARGB32 (uint32) interpolées sur `GRADIENT`
+    '''
+    positions = [p for p, _ in GRADIENT]
+    x = numpy.linspace(0.0, 1.0, size)
+    r, g, b = (numpy.interp(x, positions, [color[k] for _, color in GRADIENT]).round().astype(numpy.uint32)
+               for k in range(3))
+    return 0xff000000 | r << 16 | g << 8 | b
+
+
+class DofHeatmap(ModelView, QWidget):
+    '''
+    Carte ouvertures × distances de mise au point, avec le repère de
+    l'ouverture et de la distance courantes. Les colonnes sont alignées sur
+    les positions d'un `DofBar` de même largeur.
+    '''
+    ROW_HEIGHT = 4
+    MARGIN = SCALE_MARGIN
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self._f_values = optics.F_TRUE_VALUES
+        self.setSizePolicy(QSizePolicy.MinimumExpanding, QSizePolicy.Fixed)
+        self.setFixedHeight(len(self._f_values) * self.ROW_HEIGHT)
+        self.setMinimumWidth(300)
+
+        self._quantity = 'dof'
+        self._focal_length = float(24)
+        self._confusion = float(0.015)
+        self._f_number = 8.0
+        self._focusing_distance = float(3.0)
+        self._focus_scale = None
+
+        self._table = color_table()
+        self._buffer = None
+        self._image = None
+        self._near = None
+        self._far = None
+        self._dirty = True
+
+    @property
+    def quantity(self):
+        return self._quantity
+
+    def setQuantity(self, quantity):
+        if quantity not in QUANTITIES:
+            raise ValueError('`quantity` should be one of {}'.format(', '.join(QUANTITIES)))
+        self._quantity = quantity
+        self._invalidate()
+
+    @property
+    def focus_scale(self):
+        if self._focus_scale is None:
+            self._focus_scale = DofBar.default_focus_scale()
+        return self._focus_scale
+
+    def setFocusScale(self, scale):
+        '''
+        Distances de mise au point des colonnes : celles du `FocusScale` de
+        DofBar, pour que les colonnes suivent ses positions
+        '''
+        self._focus_scale = scale
+        self._buffer = None
+        self._invalidate()
+
+    def setFocalLength(self, f):
+        self._focal_length = float(f)
+        self._invalidate()
+
+    def setConfusionSize(self, size):
+        self._confusion = float(size)
+        self._invalidate()
+
+    def setFNumber(self, f):
+        self._f_number = float(f)
+        self.update()
+
+    def setFocusDistance(self, d):
+        self._focusing_distance = float(d)
+        self.update()
+
+    def _on_model_changed(self, fields):
+        model = self._model
+        # La taille du capteur n'intervient que par le cercle de confusion
+        if fields & {'sensor_size', 'focal_length', 'confusion'}:
+            self._focal_length = float(model.focal_length)
+            self._confusion = float(model.confusion_size)
+            self._dirty = True
+        self._f_number = float(model.f_number)
+        self._focusing_distance = float(model.focusing_distance)
+        self.update()
+
+    def _invalidate(self):
+        # Calcul différé au prochain affichage : rien n'est calculé tant que
+        # la carte est cachée
+        self._dirty = True
+        self.update()
+
+    @instrumentation.timed('raster')
+    def _compute(self):
+        '''
+        Calcule la grille et ses couleurs dans le tableau partagé avec l'image
+        '''
+        scale = self.focus_scale
+        distances = scale.distances
+        if self._buffer is None:
+            self._buffer = numpy.empty((len(self._f_values), len(distances)), dtype=numpy.uint32)
+
+        self._near, self._far = optics.dof_grid(self._focal_length, self._confusion, self._f_values, distances)
+        if self._quantity == 'dof':
+            low, high = numpy.log10(optics.DOF_RANGE)
+            with numpy.errstate(divide='ignore', invalid='ignore'):
+                t = (numpy.log10(self._far - self._near) - low) / (high - low)
+        else:
+            t = scale.scalein(self._near if self._quantity == 'near' else self._far)
+        index = numpy.clip(numpy.nan_to_num(t, nan=1.0, posinf=1.0, neginf=0.0) * (len(self._table) - 1), 0, len(self._table) - 1)
+        numpy.take(self._table, index.astype(numpy.intp), out=self._buffer)
+
+        H = optics.hyperfocal_distance(self._focal_length, self._f_values[:, None], self._confusion)
+        minimum = optics.minimum_focusing_distance(scale.origin, self._focal_length, H)
+        # Mise au point hors de DofBar, ou en deçà de la focale
+        invalid = (distances[None, :] < minimum) | (distances[None, :] <= self._focal_length/1000) | ~(self._near > 0)
+        self._buffer[invalid] = OUT_OF_RANGE
+
+        # Nouvelle image (nouvelle clé de cache pour Qt) sur la même mémoire
+        rows, columns = self._buffer.shape
+        self._image = QImage(self._buffer.data, columns, rows, self._buffer.strides[0], QImage.Format_RGB32)
+        self._dirty = False
+
+    @property
+    def image(self):
+        if self._dirty or self._image is None:
+            self._compute()
+        return self._image
+
+    def _grid_rect(self):
+        '''
+        Zone de l'image : chaque colonne centrée sur la position de DofBar
+        '''
+        columns = self.focus_scale.steps
+        d_width = self.width() - 1 - 2*self.MARGIN
+        step = d_width / (columns - 1)
+        return QRectF(self.MARGIN - step/2, 0, d_width + step, self.height())
+
+    def _cell_at(self, pos):
+        rect = self._grid_rect()
+        rows, columns = len(self._f_values), self.focus_scale.steps
+        column = int((pos.x() - rect.x()) / rect.width() * columns)
+        row = int(pos.y() / rect.height() * rows)
+        if 0 <= column < columns and 0 <= row < rows:
+            return row, column
+        return None
+
+    @instrumentation.timed('paint')
+    def paintEvent(self, e):
+        image = self.image
+        rect = self._grid_rect()
+        rows, columns = image.height(), image.width()
+
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(OUT_OF_RANGE))
+        painter.drawImage(rect, image)
+
+        # Repère de l'ouverture et de la distance de mise au point courantes
+        row = int(numpy.argmin(numpy.abs(numpy.log(self._f_values / self._f_number))))
+        column = self.focus_scale.scalein(self._focusing_distance) * (columns - 1)
+        x = rect.x() + (column + 0.5) * rect.width() / columns
+        y = (row + 0.5) * rect.height() / rows
+        painter.setPen(QPen(QColor('red'), 1))
+        painter.drawLine(QPointF(x, 0), QPointF(x, self.height()))
+        painter.drawRect(QRectF(rect.x(), y - self.ROW_HEIGHT/2, rect.width() - 1, self.ROW_HEIGHT - 1))
+        painter.end()
+
+    def event(self, e):
+        if e.type() == QEvent.ToolTip:
+            cell = self._cell_at(e.pos())
+            if cell is None or self._near is None:
+                QToolTip.hideText()
+            else:
+                QToolTip.showText(e.globalPos(), self._cell_text(*cell), self)
+            return True
+        return super().event(e)
+
+    def _cell_text(self, row, column):
+        near, far = float(self._near[row, column]), float(self._far[row, column])
+        distance = float(self.focus_scale.distances[column])
+        dof = optics.format_distance_m(far - near, infinity_limit=999.5)
+        return 'f/{:.2g} à {} : PdC {} ({} – {})'.format(
+            optics.F_VALUES[row], optics.format_distance_m(distance),
+            'infinie' if dof == 'inf' else dof,
+            optics.format_distance_m(near), optics.format_distance_m(far, infinity_limit=999.5))
+
+    def sizeHint(self):
+        return QSize(400, len(self._f_values) * self.ROW_HEIGHT)
+
+
+class HeatmapPanel(QWidget):
+    '''
+    Carte de netteté avec le choix de la grandeur affichée et sa légende
+    '''
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.heatmap = DofHeatmap(self)
+        self.combo_quantity = QComboBox(self)
+        for key, (label, _) in QUANTITIES.items():
+            self.combo_quantity.addItem(label, key)
+        self.combo_quantity.currentIndexChanged.connect(self.on_quantity_changed)
+        self.label_legend = QLabel(self)
+
+        vLayout = QVBoxLayout(self)
+        hLayout = QHBoxLayout()
+        hLayout.addWidget(self.combo_quantity)
+        hLayout.addWidget(self.label_legend, 1)
+        vLayout.addLayout(hLayout)
+        vLayout.addWidget(self.heatmap)
+        vLayout.addStretch(1)
+        self.on_quantity_changed(0)
+
+    def setModel(self, model):
+        self.heatmap.setModel(model)
+
+    def setFocusScale(self, scale):
+        self.heatmap.setFocusScale(scale)
+
+    @Slot(int)
+    def on_quantity_changed(self, index):
+        key = self.combo_quantity.itemData(index)
+        self.heatmap.setQuantity(key)
+        self.label_legend.setText('Couleurs {} ; gris : mise au point impossible'.format(QUANTITIES[key][1]))
+        self.label_legend.setToolTip('Lignes : ouvertures de f/1.4 (haut) à f/22 ; '
+                                     'colonnes : positions de la distance de mise au point')
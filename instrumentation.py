@@ -0,0 +1,222 @@
+'''
+Mesures de temps des widgets (génération SVG, chargement SVG, rendu, latence
+entre un événement souris et l'affichage) dans des histogrammes de taille fixe.
+
+Les mesures sont désactivées par défaut : `measure()` retourne alors un
+contexte vide partagé et `timestamp()` retourne `None`, sans autre coût.
+Les jalons du démarrage (`startup_mark()`), peu nombreux, sont toujours
+enregistrés.
+
+    with instrumentation.measure('DofBar', 'paint'):
+        ...
+'''
+import json
+import bisect
+import functools
+import contextlib
+from time import perf_counter_ns
+
+# Durées mesurées, dans l'ordre d'affichage
+METRICS = ('svg', 'svg_load', 'raster', 'paint', 'input')
+
+_enabled = False
+_histograms = dict()
+_NULL = contextlib.nullcontext()
+_startup = list() # (jalon, instant en ns)
+
+
+class Histogram:
+    '''
+    Histogramme de durées (µs) à classes fixes, en progression géométrique de
+    raison 2**(1/4) de 1 µs à 16 s : précision d'environ 20 % sur les
+    percentiles, mémoire constante quel que soit le nombre de mesures.
+    '''
+    BOUNDS = [2 ** (i / 4) for i in range(97)]
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, us):
+        self.counts[bisect.bisect_left(self.BOUNDS, us)] += 1
+        self.count += 1
+        self.total += us
+        if us > self.max:
+            self.max = us
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p):
+        '''
+        Borne supérieure de la classe contenant le percentile `p` (µs)
+        '''
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        cumulated = 0
+        for k, n in enumerate(self.counts):
+            cumulated += n
+            if cumulated >= rank and n:
+                return min(self.BOUNDS[k], self.max) if k < len(self.BOUNDS) else self.max
+        return self.max
+
+    def to_dict(self):
+        return dict(
+            count=self.count,
+            mean_us=self.mean,
+            p50_us=self.percentile(50),
+            p90_us=self.percentile(90),
+            p99_us=self.percentile(99),
+            max_us=self.max,
+            buckets={'{:.4g}'.format(self.BOUNDS[k]) if k < len(self.BOUNDS) else 'inf': n
+                     for k, n in enumerate(self.counts) if n},
+        )
+
+
+class _Timer:
+    __slots__ = ('_histogram', '_t0')
+
+    def __init__(self, histogram):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._t0 = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.record((perf_counter_ns() - self._t0) / 1000)
+        return False
+
+
+def enabled():
+    return _enabled
+
+
+def set_enabled(enable):
+    global _enabled
+    _enabled = bool(enable)
+
+
+def histogram(name, metric):
+    key = (name, metric)
+    h = _histograms.get(key)
+    if h is None:
+        h = _histograms[key] = Histogram()
+    return h
+
+
+def measure(name, metric):
+    '''
+    Contexte mesurant la durée du bloc `with` dans l'histogramme (name, metric)
+    '''
+    if not _enabled:
+        return _NULL
+    return _Timer(histogram(name, metric))
+
+
+def timed(metric):
+    '''
+    Décorateur de méthode : mesure chaque appel dans l'histogramme
+    (nom de la classe de l'instance, metric)
+    '''
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if not _enabled:
+                return method(self, *args, **kwargs)
+            with _Timer(histogram(type(self).__name__, metric)):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timestamp():
+    '''
+    Instant présent (ns), ou `None` si les mesures sont désactivées
+    '''
+    return perf_counter_ns() if _enabled else None
+
+
+def record_since(name, metric, t0):
+    '''
+    Enregistre la durée écoulée depuis `t0` (retourné par `timestamp()`)
+    '''
+    if _enabled and t0 is not None:
+        histogram(name, metric).record((perf_counter_ns() - t0) / 1000)
+
+
+def reset():
+    _histograms.clear()
+
+
+def _order(key):
+    name, metric = key
+    return name, METRICS.index(metric) if metric in METRICS else len(METRICS)
+
+
+def snapshot():
+    '''
+    {name: {metric: statistiques}} pour toutes les mesures enregistrées
+    '''
+    result = dict()
+    for key in sorted(_histograms, key=_order):
+        name, metric = key
+        result.setdefault(name, dict())[metric] = _histograms[key].to_dict()
+    return result
+
+
+def summary():
+    '''
+    Résumé sur une ligne : médiane et 90e percentile de chaque mesure (ms)
+    '''
+    parts = list()
+    for name, metrics in snapshot().items():
+        values = ' '.join('{} {:.2f}/{:.2f}'.format(metric, stats['p50_us']/1000, stats['p90_us']/1000)
+                          for metric, stats in metrics.items())
+        parts.append('{} : {}'.format(name, values))
+    return ' | '.join(parts) if parts else 'Aucune mesure'
+
+
+def startup_mark(name):
+    '''
+    Enregistre l'instant du jalon de démarrage `name` (le premier seulement)
+    '''
+    if all(mark != name for mark, _ in _startup):
+        _startup.append((name, perf_counter_ns()))
+
+
+def startup_trace():
+    '''
+    [(jalon, instant (ms) depuis le premier jalon)] dans l'ordre chronologique
+    '''
+    if not _startup:
+        return list()
+    t0 = _startup[0][1]
+    return [(name, (t - t0) / 1e6) for name, t in _startup]
+
+
+def startup_summary():
+    '''
+    Résumé sur une ligne des jalons de démarrage : instant (ms) et durée
+    depuis le jalon précédent
+    '''
+    parts = list()
+    previous = 0.0
+    for name, t in startup_trace():
+        parts.append('{} {:.1f} (+{:.1f})'.format(name, t, t - previous))
+        previous = t
+    return ' | '.join(parts) if parts else 'Aucun jalon'
+
+
+def dump(path):
+    '''
+    Écrit toutes les mesures dans le fichier JSON `path`
+    '''
+    with open(path, 'wt', encoding='utf-8') as f:
+        json.dump(snapshot(), f, indent=2)
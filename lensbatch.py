@@ -0,0 +1,251 @@
+'''
+Calcul sans interface graphique des valeurs affichées par Lenses (limites de
+netteté, hyperfocale, angle de champ, taille du plan de netteté) pour toutes
+les combinaisons capteur × objectif × ouverture × distance de constants.json,
+les distances trop courtes pour la mise au point étant omises.
+
+Le calcul est fait par blocs de lignes écrits au fur et à mesure, la mémoire
+utilisée ne dépend donc pas de la taille de la grille.
+
+    python lensbatch.py --distances 1 2 5 10 -o table.csv
+    python lensbatch.py --distance-range 0.2 100 500 --format columnar -o table.lcol
+'''
+import os
+import sys
+import csv
+import json
+import struct
+import argparse
+
+import numpy
+
+import optics
+from catalog import load_constants
+
+APPDIR = os.path.dirname(os.path.abspath(os.path.realpath(__file__)))
+
+# Graduations de DofBar
+DEFAULT_DISTANCES = (0.25, 0.5, 1, 2, 3, 4, 6, 10, 20, 50)
+# Origine de l'échelle de DofBar (m) : la netteté commence au plus près à
+# cette distance, la mise au point est limitée en conséquence
+NEAR_LIMIT = 0.125
+
+# Nom et type (numpy) des colonnes produites
+COLUMNS = (
+    ('sensor', '<u4'),
+    ('lens', '<u4'),
+    ('focal_mm', '<f8'),
+    ('f_number', '<f8'),
+    ('confusion_mm', '<f8'),
+    ('distance_m', '<f8'),
+    ('near_m', '<f8'),
+    ('far_m', '<f8'),
+    ('hyperfocal_m', '<f8'),
+    ('fov_deg', '<f8'),
+    ('plane_width_m', '<f8'),
+    ('plane_height_m', '<f8'),
+)
+
+# Colonnes formatées comme MainWindow.format_distance_m, avec leur limite d'infini
+DISTANCE_COLUMNS = {
+    'distance_m': 1e6,
+    'near_m': 1e6,
+    'far_m': 999.5,
+    'hyperfocal_m': 1e6,
+    'plane_width_m': 1e6,
+    'plane_height_m': 1e6,
+}
+
+COLUMNAR_MAGIC = b'LENSCOL1'
+
+
+def iter_grid(sensors, lenses, distances, confusion='DIGITAL', chunk_size=65536, near_limit=NEAR_LIMIT):
+    '''
+    Parcourt la grille capteur × objectif × ouverture × distance par blocs
+    d'au plus `chunk_size` lignes.
+
+    Comme dans DofBar, les distances inférieures à la focale ou à la distance
+    minimale de mise au point (netteté commençant à `near_limit`) ne sont pas
+    atteignables : ces lignes sont omises.
+
+    `sensors` associe un nom à une taille [l, h] (mm), `lenses` un nom à une
+    focale (mm). `confusion` est un préréglage de `optics.CONFUSION_PRESETS`,
+    calculé pour chaque capteur, ou un diamètre fixe en mm. Chaque bloc est un
+    dictionnaire {nom de colonne: tableau}, les colonnes `sensor` et `lens`
+    contenant l'indice de l'entrée dans `sensors` et `lenses`.
+    '''
+    sensor_sizes = numpy.array(list(sensors.values()), dtype=float).reshape(-1, 2)
+    focals = numpy.array(list(lenses.values()), dtype=float)
+    distances = numpy.asarray(distances, dtype=float)
+    if isinstance(confusion, str):
+        confusions = optics.confusion_size(sensor_sizes[:, 0], sensor_sizes[:, 1], confusion)
+    else:
+        confusions = numpy.full(len(sensor_sizes), float(confusion))
+
+    shape = (len(sensor_sizes), len(focals), len(optics.F_VALUES), len(distances))
+    total = int(numpy.prod(shape))
+    for start in range(0, total, chunk_size):
+        index = numpy.arange(start, min(start + chunk_size, total))
+        i_sensor, i_lens, i_f, i_distance = numpy.unravel_index(index, shape)
+
+        r = optics.compute(focals[i_lens], optics.F_TRUE_VALUES[i_f], confusions[i_sensor],
+                           sensor_sizes[i_sensor, 0], sensor_sizes[i_sensor, 1], distances[i_distance])
+        minimum = optics.minimum_focusing_distance(near_limit, focals[i_lens], r.hyperfocal)
+        reachable = (distances[i_distance] > focals[i_lens] / 1000) & (distances[i_distance] >= minimum)
+        chunk = {
+            'sensor': i_sensor,
+            'lens': i_lens,
+            'focal_mm': focals[i_lens],
+            'f_number': optics.F_VALUES[i_f],
+            'confusion_mm': confusions[i_sensor],
+            'distance_m': distances[i_distance],
+            'near_m': r.near,
+            'far_m': r.far,
+            'hyperfocal_m': r.hyperfocal,
+            'fov_deg': r.fov,
+            'plane_width_m': r.plane_width,
+            'plane_height_m': r.plane_height,
+        }
+        if not reachable.all():
+            if not reachable.any():
+                continue
+            chunk = {name: values[reachable] for name, values in chunk.items()}
+        yield chunk
+
+
+def write_csv(chunks, f, sensor_names, lens_names, format_distances=False):
+    '''
+    Écrit les blocs au format CSV dans le fichier texte `f`
+    '''
+    writer = csv.writer(f, lineterminator='\n')
+    names = [name for name, _ in COLUMNS]
+    writer.writerow(names)
+    for chunk in chunks:
+        columns = list()
+        for name in names:
+            values = chunk[name].tolist()
+            if name == 'sensor':
+                values = [sensor_names[i] for i in values]
+            elif name == 'lens':
+                values = [lens_names[i] for i in values]
+            elif format_distances and name in DISTANCE_COLUMNS:
+                limit = DISTANCE_COLUMNS[name]
+                values = [optics.format_distance_m(v, infinity_limit=limit) for v in values]
+            columns.append(values)
+        writer.writerows(zip(*columns))
+
+
+def write_columnar(chunks, f, sensor_names, lens_names, float_dtype='<f8'):
+    '''
+    Écrit les blocs dans le fichier binaire `f`, colonne par colonne, les
+    valeurs réelles étant stockées avec le type `float_dtype`.
+
+    Format : `COLUMNAR_MAGIC`, longueur (uint32) puis en-tête JSON décrivant
+    les colonnes et les noms de capteurs/objectifs, puis pour chaque bloc son
+    nombre de lignes (uint32) suivi des données brutes de chaque colonne. Un
+    bloc de 0 ligne termine le fichier.
+    '''
+    columns = [(name, float_dtype if dtype == '<f8' else dtype) for name, dtype in COLUMNS]
+    header = json.dumps({
+        'columns': columns,
+        'sensor': list(sensor_names),
+        'lens': list(lens_names),
+    }, ensure_ascii=False).encode('utf-8')
+    f.write(COLUMNAR_MAGIC)
+    f.write(struct.pack('<I', len(header)))
+    f.write(header)
+    for chunk in chunks:
+        f.write(struct.pack('<I', len(chunk['sensor'])))
+        for name, dtype in columns:
+            f.write(numpy.ascontiguousarray(chunk[name], dtype=dtype).tobytes())
+    f.write(struct.pack('<I', 0))
+
+
+def read_columnar(path):
+    '''
+    Relit un fichier écrit par `write_columnar`.
+    Retourne (colonnes, en-tête), les colonnes étant des tableaux numpy.
+    '''
+    with open(path, 'rb') as f:
+        if f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError('{} is not a columnar Lenses table'.format(path))
+        length, = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(length).decode('utf-8'))
+        dtypes = [(name, numpy.dtype(dtype)) for name, dtype in header['columns']]
+        parts = {name: list() for name, _ in dtypes}
+        while True:
+            rows, = struct.unpack('<I', f.read(4))
+            if rows == 0:
+                break
+            for name, dtype in dtypes:
+                parts[name].append(numpy.frombuffer(f.read(rows * dtype.itemsize), dtype=dtype))
+    columns = {name: numpy.concatenate(parts[name]) if parts[name] else numpy.empty(0, dtype)
+               for name, dtype in dtypes}
+    return columns, header
+
+
+def _positive_int(text):
+    try:
+        value = int(text)
+    except ValueError:
+        value = 0
+    if value <= 0:
+        raise argparse.ArgumentTypeError('{} is not a positive integer'.format(text))
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--constants', default=os.path.join(APPDIR, 'constants.json'),
+                        help='catalogue de capteurs et objectifs (défaut : constants.json)')
+    parser.add_argument('--distances', type=float, nargs='+', default=DEFAULT_DISTANCES,
+                        help='distances de mise au point (m)')
+    parser.add_argument('--distance-range', type=float, nargs=3, metavar=('START', 'STOP', 'COUNT'),
+                        help='COUNT distances réparties logarithmiquement entre START et STOP (m)')
+    parser.add_argument('--confusion', default='DIGITAL',
+                        help='DIGITAL, ZEISS ou diamètre du cercle de confusion en mm')
+    parser.add_argument('--format', choices=('csv', 'columnar'), default='csv')
+    parser.add_argument('--format-distances', action='store_true',
+                        help='formate les distances avec leur unité (CSV uniquement)')
+    parser.add_argument('--float32', action='store_true',
+                        help='valeurs réelles en simple précision (format columnar uniquement)')
+    parser.add_argument('--chunk-size', type=_positive_int, default=65536,
+                        help='nombre de lignes calculées par bloc')
+    parser.add_argument('-o', '--output', default='-', help='fichier de sortie (défaut : sortie standard)')
+    args = parser.parse_args(argv)
+
+    sensors, lenses = load_constants(args.constants)
+    # La dernière entrée est la focale personnalisée de l'interface
+    lenses = dict(list(lenses.items())[:-1])
+
+    if args.distance_range:
+        start, stop, count = args.distance_range
+        distances = numpy.geomspace(start, stop, int(count))
+    else:
+        distances = args.distances
+
+    confusion = args.confusion
+    if confusion.upper() in optics.CONFUSION_PRESETS:
+        confusion = confusion.upper()
+    else:
+        confusion = float(confusion)
+
+    chunks = iter_grid(sensors, lenses, distances, confusion=confusion, chunk_size=args.chunk_size)
+    if args.format == 'csv':
+        if args.output == '-':
+            write_csv(chunks, sys.stdout, list(sensors), list(lenses), args.format_distances)
+        else:
+            with open(args.output, 'wt', encoding='utf-8', newline='') as f:
+                write_csv(chunks, f, list(sensors), list(lenses), args.format_distances)
+    else:
+        float_dtype = '<f4' if args.float32 else '<f8'
+        if args.output == '-':
+            write_columnar(chunks, sys.stdout.buffer, list(sensors), list(lenses), float_dtype)
+        else:
+            with open(args.output, 'wb') as f:
+                write_columnar(chunks, f, list(sensors), list(lenses), float_dtype)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+'''
+Modèle central de l'état de l'appareil photo, observé par les widgets.
+'''
+from contextlib import contextmanager
+
+from PySide6.QtCore import QObject, QTimer, Signal
+
+import optics
+
+
+class CameraModel(QObject):
+    '''
+    Paramètres de prise de vue (capteur, focale, cercle de confusion,
+    ouverture, distance de mise au point) et grandeurs qui en découlent.
+
+    Les modifications sont regroupées : `changed` est émis au plus une fois
+    par passage dans la boucle d'événements, avec l'ensemble des noms des
+    paramètres modifiés. Les grandeurs dérivées sont recalculées une seule
+    fois après chaque série de modifications, à la première lecture.
+    '''
+    changed = Signal(object) # frozenset des paramètres modifiés
+
+    FIELDS = ('sensor_size', 'focal_length', 'confusion', 'f_number', 'focusing_distance')
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self._values = dict(
+            sensor_size=(22.2, 14.8), # mm
+            focal_length=24.0, # mm
+            confusion=0.015, # mm
+            f_number=8.0,
+            focusing_distance=3.0, # m
+        )
+        self._pending = set()
+        self._batch_depth = 0
+        self._scheduled = False
+        self._result = None
+
+    @property
+    def sensor_size(self):
+        return self._values['sensor_size']
+
+    @property
+    def focal_length(self):
+        return self._values['focal_length']
+
+    @property
+    def confusion_size(self):
+        return self._values['confusion']
+
+    @property
+    def f_number(self):
+        return self._values['f_number']
+
+    @property
+    def focusing_distance(self):
+        return self._values['focusing_distance']
+
+    def set(self, **values):
+        '''
+        Modifie plusieurs paramètres d'un coup ; les valeurs inchangées sont ignorées
+        '''
+        for name, value in values.items():
+            if name not in self._values:
+                raise KeyError(name)
+            if name == 'sensor_size':
+                if len(value) != 2:
+                    raise ValueError("`size` should be a tuple (w, h)")
+                value = (float(value[0]), float(value[1]))
+            else:
+                value = float(value)
+            if self._values[name] != value:
+                self._values[name] = value
+                self._pending.add(name)
+                self._result = None
+        self._schedule()
+
+    def setSensorSize(self, size):
+        self.set(sensor_size=size)
+
+    def setFocalLength(self, f):
+        self.set(focal_length=f)
+
+    def setConfusionSize(self, size):
+        self.set(confusion=size)
+
+    def setFNumber(self, f):
+        self.set(f_number=f)
+
+    def setFocusDistance(self, d):
+        self.set(focusing_distance=d)
+
+    @contextmanager
+    def batch(self):
+        '''
+        Regroupe les modifications faites dans le bloc `with` ; aucune
+        notification n'est programmée avant la fin du bloc
+        '''
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            self._schedule()
+
+    def flush(self):
+        '''
+        Émet immédiatement la notification en attente, s'il y en a une
+        '''
+        self._scheduled = False
+        if self._pending and self._batch_depth == 0:
+            fields = frozenset(self._pending)
+            self._pending.clear()
+            self.changed.emit(fields)
+
+    def _schedule(self):
+        if self._pending and self._batch_depth == 0 and not self._scheduled:
+            self._scheduled = True
+            QTimer.singleShot(0, self, self.flush)
+
+    @property
+    def result(self):
+        '''
+        Grandeurs dérivées (`optics.OpticsResult` de scalaires)
+        '''
+        if self._result is None:
+            w, h = self.sensor_size
+            r = optics.compute(self.focal_length, self.f_number, self.confusion_size, w, h, self.focusing_distance)
+            self._result = optics.OpticsResult(*(float(x) for x in r))
+        return self._result
+
+    @property
+    def hyperfocal_distance(self):
+        return self.result.hyperfocal
+
+    @property
+    def focusing_distance_near(self):
+        return self.result.near
+
+    @property
+    def focusing_distance_far(self):
+        return self.result.far
@@ -1,12 +1,184 @@
+import math
+import bisect
+
 import numpy
 
-from PySide6.QtCore import Qt, QSize
-from PySide6.QtGui import QPainter
-from PySide6.QtSvg import QSvgRenderer
+from PySide6.QtCore import Qt, QSize, QPointF, QRect, QRectF, QTimer
+from PySide6.QtGui import QPainter, QPainterPath, QPolygonF, QPen, QColor, QFont, QFontMetricsF, QPixmap
 from PySide6.QtWidgets import *
 
+import optics
+import instrumentation
+from rendercache import PixmapCache
+
+
+FONT_FAMILY = 'Segoe UI'
+
+# Marges gauche et droite des échelles de FNumberBar et DofBar (px)
+SCALE_MARGIN = 15
+# Échelle des distances de DofBar : distances extrêmes (m), nombre de positions
+FOCUS_ORIGIN = 0.125
+FOCUS_MAX_M = 999.0
+FOCUS_STEPS = 1000
+
+
+def _pen(color, dashes=None):
+    '''
+    Trait d'épaisseur 1, équivalent de `stroke-width="1"`
+    '''
+    pen = QPen(QColor(color))
+    pen.setWidthF(1.0)
+    if dashes is not None:
+        pen.setDashPattern(dashes)
+    return pen
+
+
+def _draw_rect(painter, x, y, w, h, radius, fill=None, stroke=None):
+    '''
+    Équivalent de `<rect rx="radius" ry="radius" />`
+    '''
+    painter.setPen(_pen(stroke) if stroke else Qt.NoPen)
+    painter.setBrush(QColor(fill) if fill else Qt.NoBrush)
+    painter.drawRoundedRect(QRectF(x, y, w, h), radius, radius)
+
+
+def _draw_line(painter, x1, y1, x2, y2, stroke, dashes=None):
+    painter.setPen(_pen(stroke, dashes))
+    painter.drawLine(QPointF(x1, y1), QPointF(x2, y2))
+
+
+class _MoveCoalescer:
+    '''
+    Regroupe les déplacements de souris d'un slider : le premier est traité
+    immédiatement, les suivants au plus une fois par rafraîchissement d'écran,
+    en ne gardant que la dernière position
+    '''
+
+    def __init__(self, widget, apply):
+        self._widget = widget
+        self._apply = apply
+        self._pending_x = None
+        self.enabled = True
+
+        self._timer = QTimer(widget)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self.flush)
+
+    def frame_interval(self):
+        '''
+        Durée d'une image (ms) sur l'écran du widget
+        '''
+        screen = self._widget.screen()
+        rate = screen.refreshRate() if screen is not None else 0.0
+        return max(1, int(1000 / rate)) if rate > 0 else 16
+
+    def push(self, x):
+        if not self.enabled:
+            self._apply(x)
+        elif self._timer.isActive():
+            self._pending_x = x
+        else:
+            self._apply(x)
+            self._timer.start(self.frame_interval())
+
+    def flush(self):
+        self._timer.stop()
+        if self._pending_x is not None:
+            x, self._pending_x = self._pending_x, None
+            self._apply(x)
+            self._timer.start(self.frame_interval())
+
+    def cancel(self):
+        self._timer.stop()
+        self._pending_x = None
+
+
+def _input_received(widget):
+    '''
+    Note l'instant du premier événement souris pas encore appliqué
+    '''
+    if widget._pending_input is None:
+        widget._pending_input = instrumentation.timestamp()
+
+
+def _input_applied(widget, changed):
+    '''
+    Garde l'instant noté seulement si l'événement a changé la valeur : un
+    événement sans effet ne sera suivi d'aucun affichage
+    '''
+    if changed and widget._input_time is None:
+        widget._input_time = widget._pending_input
+    widget._pending_input = None
+
+
+def _input_painted(widget):
+    '''
+    Enregistre la latence entre l'événement souris noté et l'affichage
+    '''
+    if widget._input_time is not None:
+        instrumentation.record_since(type(widget).__name__, 'input', widget._input_time)
+        widget._input_time = None
+
+
+def _draw_pixmap_rect(painter, rect, pixmap):
+    '''
+    Copie la partie `rect` (coordonnées du widget) de `pixmap`, dessiné à
+    l'origine du widget
+    '''
+    dpr = pixmap.devicePixelRatio()
+    source = QRectF(rect.x()*dpr, rect.y()*dpr, rect.width()*dpr, rect.height()*dpr)
+    painter.drawPixmap(QRectF(rect), pixmap, source)
+
+
+def _layer_pixmap(widget):
+    '''
+    Pixmap transparent de la taille du widget, à la résolution de l'écran
+    (arrondie au pixel supérieur pour les facteurs d'échelle fractionnaires)
+    '''
+    dpr = widget.devicePixelRatioF()
+    pixmap = QPixmap(math.ceil(widget.width() * dpr), math.ceil(widget.height() * dpr))
+    pixmap.setDevicePixelRatio(dpr)
+    pixmap.fill(Qt.transparent)
+    return pixmap
+
+
+def _draw_text(painter, x, y, text, size, color, anchor='start'):
+    '''
+    Équivalent de `<text>` : (x, y) est le point de la ligne de base,
+    `anchor` vaut 'start' ou 'middle' comme `text-anchor`
+    '''
+    font = QFont(FONT_FAMILY)
+    font.setPixelSize(size)
+    painter.setFont(font)
+    painter.setPen(QColor(color))
+    if anchor == 'middle':
+        x -= QFontMetricsF(font, painter.device()).horizontalAdvance(text) / 2
+    painter.drawText(QPointF(x, y), text)
+
+
+class ModelView:
+    '''
+    Widget suivant un `model.CameraModel` : `setModel()` appelle
+    `_on_model_changed(fields)` à chaque changement, et une première fois
+    avec tous les champs
+    '''
+
+    def setModel(self, model):
+        '''
+        Suit les changements d'un `model.CameraModel`
+        '''
+        self._model = model
+        model.changed.connect(self._on_model_changed)
+        self._on_model_changed(frozenset(model.FIELDS))
+
+    def _on_model_changed(self, fields):
+        '''
+        Appelée avec le frozenset des champs modifiés ; ne fait rien par défaut
+        '''
 
-class FovDisplay(QWidget):
+
+class FovDisplay(ModelView, QWidget):
     '''
     Widget affichant le schéma montrant l'angle de vue de l'appareil photo
     '''
@@ -15,7 +187,6 @@ class FovDisplay(QWidget):
         super().__init__(*args, **kwargs)
 
         self.setFixedSize(300, 142)
-        self._renderer = QSvgRenderer()
 
         self._min_m = 0.01
         self._max_m = 999
@@ -23,17 +194,31 @@ class FovDisplay(QWidget):
         self._sensor_size = (22.2, 14.8)
         self._focusing_distance = 3.0 # distance du capteur au plan de netteté
 
+        # Rendus mis en cache selon (taille, dpr, état)
+        self._cache = PixmapCache(max_bytes=4*1024*1024)
+
+    @property
+    def render_cache(self):
+        return self._cache
+
+    def setRenderCache(self, cache):
+        '''
+        Remplace le cache de rendus, par exemple pour le partager entre widgets
+        '''
+        self._cache = cache
+        self.update()
+
     @property
     def focus_plane_width(self):
-        return (self._focusing_distance-0.001*self._focal_length) * self._sensor_size[0] / self._focal_length
+        return float(optics.focus_plane_size(self._focusing_distance, self._focal_length, self._sensor_size[0]))
 
     @property
     def focus_plane_height(self):
-        return (self._focusing_distance-0.001*self._focal_length) * self._sensor_size[1] / self._focal_length
+        return float(optics.focus_plane_size(self._focusing_distance, self._focal_length, self._sensor_size[1]))
 
     @property
     def fov_angle(self):
-        return 2*numpy.arctan(numpy.sqrt(self._sensor_size[0]**2 + self._sensor_size[1]**2) / (2*self._focal_length)) * 180/numpy.pi
+        return float(optics.fov_angle(self._focal_length, *self._sensor_size))
 
     @property
     def focusing_distance(self):
@@ -53,16 +238,76 @@ class FovDisplay(QWidget):
         self._sensor_size = size
         self.update()
 
+    def _on_model_changed(self, fields):
+        if not fields & {'sensor_size', 'focal_length', 'focusing_distance'}:
+            return
+        model = self._model
+        self._sensor_size = model.sensor_size
+        self._focal_length = float(self.clip(model.focal_length, 1.0, 1000.0))
+        self._focusing_distance = float(self.clip(model.focusing_distance, self._min_m, self._max_m))
+        self.update()
+
+    @instrumentation.timed('paint')
     def paintEvent(self, e):
+        key = ('FovDisplay', self.width(), self.height(), self.devicePixelRatioF(),
+               self._focusing_distance, self._focal_length, tuple(self._sensor_size))
+        pixmap = self._cache.pixmap(key, self._render)
+
         painter = QPainter(self)
-        svg_bytes = self.generate_svg()
-        self._renderer.load(svg_bytes)
-        self._renderer.render(painter)
+        painter.drawPixmap(0, 0, pixmap)
         painter.end()
 
+    @instrumentation.timed('raster')
+    def _render(self):
+        pixmap = _layer_pixmap(self)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        self.draw(painter)
+        painter.end()
+        return pixmap
+
     def sizeHint(self):
         return QSize(300, 142)
 
+    def draw(self, painter):
+        '''
+        Dessine le schéma avec `painter`, à l'identique de `generate_svg()`
+        '''
+        width = self.size().width()
+        height = self.size().height()
+
+        painter.save()
+        painter.translate(0.5, 0.5)
+        _draw_rect(painter, 0, 0, int(width-1), int(height-1), 4, fill='white', stroke='#888888')
+
+        cone = QPolygonF([QPointF(15, 70), QPointF(165, 10), QPointF(245, 130)])
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor('#fff9e5'))
+        painter.drawPolygon(cone)
+        painter.setBrush(QColor('#f0ead6'))
+        painter.drawPolygon(QPolygonF([QPointF(165, 10), QPointF(245, 130), QPointF(165, 88)]))
+        painter.setBrush(QColor('#eeeeee'))
+        painter.drawPolygon(QPolygonF([QPointF(165, 10), QPointF(245, 50), QPointF(245, 130)]))
+        painter.setBrush(Qt.NoBrush)
+        painter.setPen(_pen('#ffcf31'))
+        painter.drawPolygon(cone)
+        _draw_line(painter, 20, 70, 205, 70, 'red', dashes=[5, 5])
+        painter.setPen(_pen('black'))
+        painter.drawPolyline(QPolygonF([QPointF(165, 10), QPointF(245, 50), QPointF(245, 130)]))
+        painter.setPen(_pen('#c0ad71'))
+        painter.drawPolyline(QPolygonF([QPointF(165, 10), QPointF(165, 88), QPointF(245, 130)]))
+
+        _draw_rect(painter, 91, 63, 38, 14, 3, fill='white', stroke='red')
+        _draw_text(painter, 91+19, 63+10.5, '{:.3g} m'.format(self.focusing_distance), 10, 'red', anchor='middle')
+        _draw_text(painter, 200, 20, '{:.3g} m'.format(self.focus_plane_width), 12, 'black')
+        _draw_text(painter, 250, 93, '{:.3g} m'.format(self.focus_plane_height), 12, 'black')
+
+        angle = QPainterPath(QPointF(30, 58))
+        angle.cubicTo(QPointF(44, 62), QPointF(48, 73), QPointF(44, 84))
+        painter.strokePath(angle, _pen('black'))
+        _draw_text(painter, 35, 50, '{:.3g} °'.format(self.fov_angle), 12, 'black', anchor='middle')
+        painter.restore()
+
     @staticmethod
     def clip(x, vmin, vmax):
         if x < vmin:
@@ -71,6 +316,7 @@ class FovDisplay(QWidget):
             return vmax
         return x
 
+    @instrumentation.timed('svg')
     def generate_svg(self):
         width = self.size().width()
         height = self.size().height()
@@ -201,7 +447,7 @@ viewBox="0 0 {w} {h}"
         return '\n'.join(svg).encode('utf-8')
 
 
-class FNumberBar(QAbstractSlider):
+class FNumberBar(ModelView, QAbstractSlider):
     '''
     Slider de sélection de l'ouverture de l'appariel photo
     '''
@@ -212,19 +458,25 @@ class FNumberBar(QAbstractSlider):
         self.setFixedHeight(27)
         self.setMinimumWidth(300)
         self.setOrientation(Qt.Horizontal)
-        self._renderer = QSvgRenderer()
 
         # self.f_true_values = 2**((numpy.arange(25)+3)/6)
-        self._f_true_values = numpy.array([1.4142135623730951, 1.5874010519681994, 1.7817974362806785, 2.0,
-            2.244924096618746, 2.5198420997897464, 2.8284271247461903, 3.174802103936399, 3.563594872561357, 4.0,
-            4.489848193237491, 5.039684199579493, 5.656854249492381, 6.3496042078727974, 7.127189745122715, 8.0,
-            8.979696386474982, 10.079368399158986, 11.313708498984761, 12.699208415745595, 14.25437949024543, 16.0,
-            17.959392772949972, 20.158736798317967, 22.627416997969522], dtype=float)
-        self._f_values = numpy.array([1.4, 1.6, 1.8, 2.0, 2.2, 2.5, 2.8, 3.2, 3.5, 4.0, 4.5, 5.0, 5.6, 6.3, 7.1, 8.0, 9.0, 10.0, 11.0, 13.0, 14.0, 16.0, 18.0, 20.0, 22.0], dtype=float)
+        self._f_true_values = optics.F_TRUE_VALUES
+        self._f_values = optics.F_VALUES
         self.setRange(0, len(self._f_values)-1)
 
         self._sensor_size = (22.2, 14.8)
         self._confusion = float(0.015)
+        self._update_diffraction()
+
+        # Rendus mis en cache selon (position, taille, cercle de confusion, dpr),
+        # assez grand par défaut pour toutes les positions à la taille courante
+        self._cache = PixmapCache(max_bytes=0)
+        self._auto_cache_limit = True
+        self._moves = _MoveCoalescer(self, self._move_f_number)
+        self._input_time = None
+        self._pending_input = None
+        # Zone du curseur affiché, seule redessinée quand l'ouverture change
+        self._painted_cursor = None
         
         self.setValue(15)
     
@@ -252,53 +504,232 @@ class FNumberBar(QAbstractSlider):
     
     def setConfusionSize(self, size):
         self._confusion = size
+        self._update_diffraction()
+        self.update()
+
+    def _update_diffraction(self):
+        mask = optics.diffraction_limited(self._f_true_values, self._confusion)
+        mask.setflags(write=False)
+        self._diffraction_mask = mask
+        limited = numpy.flatnonzero(mask)
+        self._diffraction_index = int(limited[0]) if len(limited) else None
+
+    @property
+    def diffraction_mask(self):
+        '''
+        Masque (lecture seule) des positions du slider limitées par la
+        diffraction pour le cercle de confusion courant
+        '''
+        return self._diffraction_mask
+
+    @property
+    def diffraction_limit(self):
+        '''
+        Nombre f à partir duquel la diffraction limite la netteté, ou None
+        '''
+        if self._diffraction_index is None:
+            return None
+        return float(self._f_true_values[self._diffraction_index])
+
+    def isDiffractionLimited(self, value=None):
+        '''
+        La position `value` (par défaut la position courante) est-elle
+        limitée par la diffraction ?
+        '''
+        return bool(self._diffraction_mask[self.value() if value is None else value])
+
+    def _on_model_changed(self, fields):
+        model = self._model
+        if fields & {'sensor_size', 'confusion'}:
+            self._sensor_size = model.sensor_size
+            if model.confusion_size != self._confusion:
+                self._confusion = model.confusion_size
+                self._update_diffraction()
+            self.update()
+        if 'f_number' in fields and model.f_number != self.f_number:
+            self.setFNumber(model.f_number)
+
+    @property
+    def render_cache(self):
+        return self._cache
+
+    def setRenderCache(self, cache):
+        '''
+        Remplace le cache de rendus, par exemple pour le partager entre widgets
+        '''
+        self._cache = cache
+        self._auto_cache_limit = False
         self.update()
 
+    def setCacheLimit(self, max_bytes):
+        '''
+        Taille maximale du cache de rendus (octets) ; None : taille de toutes
+        les positions à la taille courante du widget
+        '''
+        self._auto_cache_limit = max_bytes is None
+        if max_bytes is not None:
+            self._cache.set_max_bytes(max_bytes)
+
+    def _cache_limit(self):
+        dpr = self.devicePixelRatioF()
+        return len(self._f_values) * math.ceil(self.width()*dpr) * math.ceil(self.height()*dpr) * 4
+
+    @instrumentation.timed('paint')
     def paintEvent(self, e):
-        painter = QPainter(self)
+        if self._auto_cache_limit:
+            limit = self._cache_limit()
+            if limit != self._cache.max_bytes:
+                self._cache.set_max_bytes(limit)
+        key = ('FNumberBar', self.value(), self.width(), self.height(), self.confusion_size, self.devicePixelRatioF())
+        pixmap = self._cache.pixmap(key, self._render)
 
-        svg_bytes = self.generate_svg()
-        self._renderer.load(svg_bytes)
-        self._renderer.render(painter)
+        painter = QPainter(self)
+        _draw_pixmap_rect(painter, e.rect(), pixmap)
         painter.end()
+        self._painted_cursor = self._cursor_rect()
+        _input_painted(self)
+
+    def _cursor_rect(self):
+        '''
+        Rectangle (coordonnées du widget) couvert par le curseur et son étiquette
+        '''
+        f_number_px, _ = self._cursor()
+        return QRect(f_number_px - 15, 0, 32, self.height())
+
+    def sliderChange(self, change):
+        if change == QAbstractSlider.SliderValueChange and self._painted_cursor is not None:
+            # Seules les zones de l'ancien et du nouveau curseur changent
+            self.update(self._painted_cursor.united(self._cursor_rect()))
+        else:
+            super().sliderChange(change)
 
     def sizeHint(self):
         return QSize(400, 27)
 
-    def _update_f_number(self, e):
-        e.accept()
+    @instrumentation.timed('raster')
+    def _render(self):
+        pixmap = _layer_pixmap(self)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        self.draw(painter)
+        painter.end()
+        return pixmap
+
+    def _marks(self):
+        '''
+        Graduations de l'échelle : liste de (position en px, valeur, couleur),
+        les ouvertures intermédiaires ayant une valeur `None`
+        '''
+        width = self.size().width()
+        d_width = int(width-1 - 2*SCALE_MARGIN)
+        steps = len(self._f_values)
+
+        f_values = [i for i in range(steps) if i%3==0]
+        f_minors = [i for i in range(steps) if i%3!=0]
+
+        marks = list()
+        for value in f_values + f_minors:
+            if self._diffraction_mask[value]:
+                color = "#ff6a25"
+            else:
+                color = "black"
+            location_px = int(SCALE_MARGIN + d_width * value/(steps - 1))
+            label = self._f_values[value] if value in f_values else None
+            marks.append((location_px, label, color))
+        return marks
+
+    def _cursor(self):
+        '''
+        Position en px et couleur du curseur
+        '''
+        d_width = int(self.size().width()-1 - 2*SCALE_MARGIN)
+        steps = len(self._f_values)
+        f_number_px = int(SCALE_MARGIN + d_width * self.value()/(steps - 1))
+        if self._diffraction_mask[self.value()]:
+            color = "#ff6a25"
+        else:
+            color = "#0066c5"
+        return f_number_px, color
+
+    def draw(self, painter):
+        '''
+        Dessine le slider avec `painter`, à l'identique de `generate_svg()`
+        '''
+        width = self.size().width()
+
+        painter.save()
+        painter.translate(0.5, 0.5)
+        _draw_rect(painter, 0, 0, int(width-1), 26, 4, fill='white', stroke='#888888')
+        _draw_text(painter, 28, 16.5, 'f ⁄', 10, '#0066c5')
+
+        for location_px, label, color in self._marks():
+            text = '·' if label is None else '{:.3g}'.format(label)
+            _draw_text(painter, location_px, 17, text, 12, color, anchor='middle')
+
+        f_number_px, color = self._cursor()
+        _draw_line(painter, f_number_px, 0, f_number_px, 26, color)
+        _draw_rect(painter, f_number_px-13, 6, 26, 14, 3, fill='white', stroke=color)
+        _draw_text(painter, f_number_px, 16.5, '{:.3g}'.format(self._f_values[self.value()]), 10, color, anchor='middle')
+        painter.restore()
+
+    def inputCoalescing(self):
+        return self._moves.enabled
+
+    def setInputCoalescing(self, enabled):
+        '''
+        Active le regroupement des déplacements de souris (une mise à jour
+        au plus par image affichée)
+        '''
+        self._moves.enabled = bool(enabled)
+        if not enabled:
+            self._moves.cancel()
+
+    def _value_at(self, x):
         vmin, vmax = self.minimum(), self.maximum()
-        d_width = self.size().width() - 30 - 2
+        d_width = self.size().width() - 2*SCALE_MARGIN - 2
         step_size = d_width / (vmax-vmin)
-        click_x = e.x() - 15 + step_size/2
+        click_x = x - SCALE_MARGIN + step_size/2
         pc = click_x / d_width
-        value = int(vmin + pc * (vmax-vmin))
-        self.setValue(value)
+        return int(vmin + pc * (vmax-vmin))
+
+    def _update_f_number(self, e):
+        e.accept()
+        self.setValue(self._value_at(e.x()))
+
+    def _move_f_number(self, x):
+        value = self._value_at(x)
+        changed = value != self.value()
+        if changed:
+            self.setValue(value)
+        _input_applied(self, changed)
 
     def mouseMoveEvent(self, e):
-        self._update_f_number(e)
+        e.accept()
+        _input_received(self)
+        self._moves.push(e.x())
 
     def mousePressEvent(self, e):
+        self._moves.cancel()
+        _input_received(self)
+        value = self.value()
         self._update_f_number(e)
+        _input_applied(self, self.value() != value)
+
+    def mouseReleaseEvent(self, e):
+        self._moves.flush()
+        self._moves.cancel()
     
     @staticmethod
     def airy_disc_size(f_number):
         '''
         Limite de diffraction (tache d'Airy)
         '''
-        lambda_ = 550e-9 # m   longueur d'onde de la lumière
-        return 2.44*lambda_*f_number*1000 # mm
+        return optics.airy_disc_size(f_number) # mm
 
+    @instrumentation.timed('svg')
     def generate_svg(self):
         width = self.size().width()
         height = 27
-        d_width = int(width-1 - 30)
-        steps = len(self._f_values)
-
-        f_values = [i for i in range(steps) if i%3==0]
-        f_minors = [i for i in range(steps) if i%3!=0]
-
-        f_number_px = int(15 + d_width * self.value()/(steps - 1))
 
         svg = list()
         svg.append('''<?xml version="1.0" encoding="utf-8"?>
@@ -329,40 +760,17 @@ viewBox="0 0 {w} {h}"
       f ⁄
     </text>'''.format(w=int(width-1)))
 
-        for value in f_values:
-            if self.airy_disc_size(self._f_true_values[value]) > self.confusion_size:
-                color = "#ff6a25"
-            else:
-                color = "black"
-            location_px = int(15 + d_width * value/(steps - 1))
+        for location_px, label, color in self._marks():
             svg.append('''    <text
       x="{}" y="17"
       text-anchor="middle"
       font-family="Segoe UI"
       font-size="12"
       fill="{}">
-      {:.3g}
-    </text>'''.format(int(location_px), color, self._f_values[value]))
+      {}
+    </text>'''.format(int(location_px), color, '&#183;' if label is None else '{:.3g}'.format(label)))
 
-        for value in f_minors:
-            if self.airy_disc_size(self._f_true_values[value]) > self.confusion_size:
-                color = "#ff6a25"
-            else:
-                color = "black"
-            location_px = int(15 + d_width * value/(steps - 1))
-            svg.append('''    <text
-      x="{}" y="17"
-      text-anchor="middle"
-      font-family="Segoe UI"
-      font-size="12"
-      fill="{}">
-      &#183;
-    </text>'''.format(int(location_px), color))
-
-        if self.airy_disc_size(self._f_true_values[self.value()]) > self.confusion_size:
-            color = "#ff6a25"
-        else:
-            color = "#0066c5"
+        f_number_px, color = self._cursor()
         svg.append('''    <g
       id="f-line">
       <line
@@ -395,7 +803,84 @@ viewBox="0 0 {w} {h}"
         return '\n'.join(svg).encode('utf-8')
 
 
-class DofBar(QAbstractSlider):
+class FocusScale:
+    '''
+    Échelle du slider de mise au point : la position relative (0 à 1) vaut
+    1 - exp(origin**(1/3) - d**(1/3)) pour une distance `d` (m).
+
+    Les correspondances sont tabulées une fois pour toutes (avec un
+    suréchantillonnage des `steps` positions du slider) ; les conversions
+    se font par recherche dichotomique et interpolation linéaire, sur des
+    scalaires comme sur des tableaux.
+    '''
+    OVERSAMPLING = 8
+
+    def __init__(self, origin, max_m, steps=1000):
+        self.origin = float(origin)
+        self.max_m = float(max_m)
+        self.steps = int(steps)
+        self._a = numpy.exp(self.origin**(1/3))
+
+        # Noeuds régulièrement espacés en position, complétés vers les grandes
+        # distances par des noeuds régulièrement espacés en racine cubique
+        n = (self.steps - 1) * self.OVERSAMPLING
+        pc = numpy.arange(1, n) / n
+        d = numpy.log(self._a/(1.0 - pc))**3
+        # (tri et dédoublonnage explicites : numpy.union1d importe numpy.ma,
+        # soit plusieurs dizaines de ms au démarrage)
+        d = numpy.concatenate((d[d < self.max_m], numpy.linspace(self.origin**(1/3), self.max_m**(1/3), self.steps)**3))
+        d.sort()
+        d = d[numpy.concatenate(([True], d[1:] != d[:-1]))]
+        self._d = numpy.clip(d, self.origin, self.max_m)
+        self._pc = self._exact_scalein(self._d)
+        self._pc[0] = 0.0
+        self._d_list = self._d.tolist()
+        self._pc_list = self._pc.tolist()
+
+        # Distance (m) de chacune des positions du slider
+        self.distances = self.scaleout(numpy.arange(self.steps) / (self.steps - 1))
+
+    def _exact_scalein(self, x_m):
+        return 1.0 - self._a*numpy.exp(-numpy.cbrt(x_m))
+
+    def scalein(self, x_m):
+        '''
+        Position relative (0 à 1) des distances `x_m` (m)
+        '''
+        if isinstance(x_m, (float, int)):
+            if x_m > self.max_m:
+                return float(self._exact_scalein(x_m))
+            return self._interp(x_m, self._d_list, self._pc_list)
+        x = numpy.asarray(x_m, dtype=float)
+        pc = numpy.interp(x, self._d, self._pc)
+        beyond = x > self.max_m
+        if beyond.any():
+            pc = numpy.where(beyond, self._exact_scalein(numpy.where(beyond, x, self.max_m)), pc)
+        return pc
+
+    def scaleout(self, y_pc):
+        '''
+        Distances (m) des positions relatives `y_pc`
+        '''
+        if isinstance(y_pc, (float, int)):
+            return self._interp(y_pc, self._pc_list, self._d_list)
+        return numpy.interp(y_pc, self._pc, self._d)
+
+    @staticmethod
+    def _interp(x, xp, fp):
+        '''
+        Interpolation linéaire d'un scalaire dans une table croissante
+        '''
+        i = bisect.bisect_right(xp, x)
+        if i == 0:
+            return fp[0]
+        if i == len(xp):
+            return fp[-1]
+        x0, x1 = xp[i-1], xp[i]
+        return fp[i-1] + (fp[i] - fp[i-1]) * (x - x0) / (x1 - x0)
+
+
+class DofBar(ModelView, QAbstractSlider):
     '''
     Slider de sélection de la distance de mise au point de l'appareil photo
     '''
@@ -406,13 +891,12 @@ class DofBar(QAbstractSlider):
         self.setFixedHeight(58)
         self.setMinimumWidth(300)
         self.setOrientation(Qt.Horizontal)
-        self._renderer = QSvgRenderer()
 
-        self.setRange(0, 999) # slider avec 1000 positions
+        self.setRange(0, FOCUS_STEPS - 1)
 
-        self._origin = float(0.125)
+        self._origin = float(FOCUS_ORIGIN)
         # self._origin = float(0.25)
-        self._max_m = float(999.0)
+        self._max_m = float(FOCUS_MAX_M)
 
         self._focal_length = float(24)
         self._f_number = 8.0
@@ -420,6 +904,23 @@ class DofBar(QAbstractSlider):
         self._confusion = float(0.015)
         self._focusing_distance = float(3.0)
 
+        # Calques mis en cache : l'échelle ne dépend que de la largeur et de
+        # `_origin`, le fond y ajoute la zone hyperfocale
+        self._scale_layer = None
+        self._scale_key = None
+        self._background_layer = None
+        self._background_key = None
+        # Cache partagé optionnel pour le calque d'échelle (identique pour
+        # toutes les barres de même largeur)
+        self._cache = None
+
+        self._moves = _MoveCoalescer(self, self._move_focusing_distance)
+        self._input_time = None
+        self._pending_input = None
+        # Zone des repères affichés, seule redessinée quand la distance change
+        self._painted_markers = None
+        self._focus_scale = None
+
     @property
     def confusion_size(self):
         '''
@@ -430,12 +931,7 @@ class DofBar(QAbstractSlider):
 
     @property
     def minimum_focusing_distance(self):
-        Dn = float(self._origin)
-        f = float(self._focal_length)
-        N = float(self._f_number)
-        c = float(self.confusion_size)
-        H = f + f**2/(N*c)
-        return float(Dn*(2*f - H)/(1000*Dn + f - H))
+        return float(optics.minimum_focusing_distance(self._origin, self._focal_length, self.hyperfocal_distance))
 
     @property
     def focusing_distance(self):
@@ -446,40 +942,25 @@ class DofBar(QAbstractSlider):
         '''
         Distance hyperfocale en m
         '''
-        f = float(self._focal_length)
-        N = float(self._f_number)
-        c = float(self.confusion_size)
-        return (f + f**2/(N*c)) / 1000
+        return float(optics.hyperfocal_distance(self._focal_length, self._f_number, self.confusion_size))
 
     @property
     def focusing_distance_near(self):
         '''
         Distance minimale de netteté (m)
         '''
-        s = self.focusing_distance
-        f = float(self._focal_length)
-        H = self.hyperfocal_distance
-        return s * (H - f/1000) / (H + s - 2*f/1000)
+        return float(optics.focusing_distance_near(self.focusing_distance, self._focal_length, self.hyperfocal_distance))
 
     @property
     def focusing_distance_far(self):
         '''
         Distance maximale de netteté (m)
         '''
-        s = self.focusing_distance
-        H = self.hyperfocal_distance
-        if (H - s) <= 0:
-            return numpy.Infinity
-        else:
-            f = float(self._focal_length)
-            return s * (H - f/1000) / (H - s)
+        return float(optics.focusing_distance_far(self.focusing_distance, self._focal_length, self.hyperfocal_distance))
 
     def setFocusDistance(self, d):
         self._focusing_distance = float(self.clip(d, self.minimum_focusing_distance, self._max_m))
-        vmin, vmax = self.minimum(), self.maximum()
-        pc = self._scalein(self._focusing_distance)
-        value = int(vmin + pc * (vmax-vmin))
-        self.setValue(value)
+        self.setValue(self._distance_value(self._focusing_distance))
         # self.update()
 
     def setFocalLength(self, f):
@@ -500,50 +981,194 @@ class DofBar(QAbstractSlider):
         self._confusion = size
         self.update()
 
+    def _on_model_changed(self, fields):
+        model = self._model
+        if fields & {'sensor_size', 'focal_length', 'f_number', 'confusion'}:
+            self._sensor_size = model.sensor_size
+            self._focal_length = float(self.clip(model.focal_length, 1.0, 1000.0))
+            self._f_number = float(self.clip(model.f_number, 1.0, 22.0))
+            self._confusion = model.confusion_size
+            self.update()
+        if 'focusing_distance' in fields and model.focusing_distance != self._focusing_distance:
+            self.setFocusDistance(model.focusing_distance)
+
+    @instrumentation.timed('paint')
     def paintEvent(self, e):
+        g = self._geometry()
+        rect = e.rect()
+        markers = self._markers_rect(g)
+
         painter = QPainter(self)
-        svg_bytes = self.generate_svg()
-        self._renderer.load(svg_bytes)
-        self._renderer.render(painter)
+        _draw_pixmap_rect(painter, rect, self._background(g))
+        if rect.intersects(markers):
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.translate(0.5, 25.5)
+            self._draw_markers(painter, g)
         painter.end()
+        self._painted_markers = markers
+        _input_painted(self)
+
+    def _markers_rect(self, g):
+        '''
+        Rectangle (coordonnées du widget) couvert par les repères de mise au
+        point et de netteté
+        '''
+        left = min(g['Dn'], g['Dn_left'], g['Df_left'], g['focus_left'])
+        right = max(g['Dn'] + max(g['dof'], 0), g['Df'], g['Df_left'] + 30, g['focus_left'] + 30)
+        left = math.floor(left) - 2
+        return QRect(left, 0, math.ceil(right) + 3 - left, self.height())
+
+    def sliderChange(self, change):
+        if change == QAbstractSlider.SliderValueChange and self._painted_markers is not None:
+            # Le fond ne dépend pas de la distance de mise au point : seules
+            # les zones des anciens et des nouveaux repères changent
+            self.update(self._painted_markers.united(self._markers_rect(self._geometry())))
+        else:
+            super().sliderChange(change)
 
     def sizeHint(self):
         return QSize(400, 58)
 
+    def _background(self, g):
+        '''
+        Calque de fond (échelle et zone hyperfocale), redessiné seulement si
+        la taille, le dpr, `_origin` ou la distance hyperfocale ont changé
+        '''
+        scale_key = ('DofBar.scale', self.width(), self.height(), self.devicePixelRatioF(), self._origin)
+        if self._scale_key != scale_key:
+            if self._cache is not None:
+                self._scale_layer = self._cache.pixmap(scale_key, self._render_scale)
+            else:
+                self._scale_layer = self._render_scale()
+            self._scale_key = scale_key
+
+        background_key = (scale_key, g['Dn_h'], g['H'])
+        if self._background_key != background_key:
+            self._background_layer = self._render_background(g)
+            self._background_key = background_key
+
+        return self._background_layer
+
+    @property
+    def render_cache(self):
+        return self._cache
+
+    def setRenderCache(self, cache):
+        '''
+        Partage le calque d'échelle par le `PixmapCache` `cache` (None : calque
+        propre au widget)
+        '''
+        self._cache = cache
+        self._scale_key = None
+        self.update()
+
+    @instrumentation.timed('raster')
+    def _render_scale(self):
+        pixmap = _layer_pixmap(self)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.translate(0.5, 25.5)
+        self._draw_scale(painter)
+        painter.end()
+        return pixmap
+
+    @instrumentation.timed('raster')
+    def _render_background(self, g):
+        pixmap = _layer_pixmap(self)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.save()
+        painter.translate(0.5, 25.5)
+        self._draw_hyperfocal(painter, g)
+        painter.restore()
+        painter.drawPixmap(0, 0, self._scale_layer)
+        painter.end()
+        return pixmap
+
+    @staticmethod
+    def default_focus_scale():
+        '''
+        Échelle des distances d'un DofBar non modifié
+        '''
+        return FocusScale(FOCUS_ORIGIN, FOCUS_MAX_M, FOCUS_STEPS)
+
+    @property
+    def focus_scale(self):
+        '''
+        Table de correspondance position <-> distance, reconstruite si
+        `_origin` ou `_max_m` ont changé
+        '''
+        scale = self._focus_scale
+        if scale is None or (scale.origin, scale.max_m, scale.steps) != (self._origin, self._max_m, self.maximum()-self.minimum()+1):
+            scale = FocusScale(self._origin, self._max_m, self.maximum()-self.minimum()+1)
+            self._focus_scale = scale
+        return scale
+
     def _scalein(self, x_m):
-        if x_m >= self._origin:
-            a = numpy.exp(self._origin**(1/3))
-            return float(1.0-a*numpy.exp(-x_m**(1/3)))
-        else:
-            return float(0.0)
+        return self.focus_scale.scalein(x_m)
 
     def _scaleout(self, y_pc):
-        if y_pc < 0.0:
-            return self._origin
-        elif y_pc < 1.0:
-            a = numpy.exp(self._origin**(1/3))
-            return numpy.log(-a/(y_pc - 1.0))**3
-        else:
-            return self._max_m
+        return self.focus_scale.scaleout(y_pc)
 
-    def _update_focusing_distance(self, e):
-        e.accept()
+    def _distance_value(self, d):
+        '''
+        Position du slider correspondant à la distance `d` (m)
+        '''
+        vmin, vmax = self.minimum(), self.maximum()
+        pc = self._scalein(d)
+        return int(vmin + pc * (vmax-vmin))
+
+    def _distance_at(self, x):
         vmin, vmax = self.minimum(), self.maximum()
-        d_width = self.size().width() - 30 - 2
+        d_width = self.size().width() - 2*SCALE_MARGIN - 2
         step_size = d_width / (vmax-vmin)
-        click_x = e.x() - 15 + step_size/2
+        click_x = x - SCALE_MARGIN + step_size/2
         pc = click_x / d_width
-        self.setFocusDistance(self._scaleout(pc))
+        return self._scaleout(pc)
+
+    def inputCoalescing(self):
+        return self._moves.enabled
+
+    def setInputCoalescing(self, enabled):
+        '''
+        Active le regroupement des déplacements de souris (une mise à jour
+        au plus par image affichée)
+        '''
+        self._moves.enabled = bool(enabled)
+        if not enabled:
+            self._moves.cancel()
+
+    def _update_focusing_distance(self, e):
+        e.accept()
+        self.setFocusDistance(self._distance_at(e.x()))
+
+    def _move_focusing_distance(self, x):
+        d = self._distance_at(x)
+        value = self._distance_value(self.clip(d, self.minimum_focusing_distance, self._max_m))
+        changed = value != self.value()
+        if changed:
+            self.setFocusDistance(d)
+        _input_applied(self, changed)
 
     def mouseMoveEvent(self, e):
-        self._update_focusing_distance(e)
+        e.accept()
+        _input_received(self)
+        self._moves.push(e.x())
 
     def mousePressEvent(self, e):
+        self._moves.cancel()
         if (26-8) < e.y(): #  < (52+8)
+            _input_received(self)
+            value = self.value()
             self._update_focusing_distance(e)
+            _input_applied(self, self.value() != value)
         else:
             e.ignore()
 
+    def mouseReleaseEvent(self, e):
+        self._moves.flush()
+        self._moves.cancel()
+
     @staticmethod
     def clip(x, vmin, vmax):
         if x < vmin:
@@ -552,43 +1177,45 @@ class DofBar(QAbstractSlider):
             return vmax
         return x
 
-    def generate_svg(self):
+    def _ticks(self):
+        '''
+        Graduations de l'échelle : liste de (position en px, valeur), les
+        graduations intermédiaires ayant une valeur `None`
+        '''
+        width = self.size().width()
+        d_width = int(width - 2*SCALE_MARGIN - 2)
+
+        dof_origin = self._origin
+        dof_values = [v for v in (0.125, 0.25, 1, 2, 3, 4, 6, 10, 20, 50) if v > dof_origin]
+        dof_values.insert(0, dof_origin)
+        dof_minors = [v for v in (0.5, 1.5, 2.5, 5) if v > dof_origin]
+
+        locations_px = SCALE_MARGIN + d_width * self._scalein(numpy.array(dof_values + dof_minors))
+        labels = dof_values + [None]*len(dof_minors)
+        return [(int(location_px), label) for location_px, label in zip(locations_px, labels)]
+
+    def _geometry(self):
+        '''
+        Positions en px de la zone hyperfocale et des repères de mise au point
+        '''
         s = self.focusing_distance
-        
-        f = float(self._focal_length)
-        N = float(self._f_number)
-        c = float(self.confusion_size)
 
         # # Formules fonctions de Dn et Df
         # s = 2*Df*Dn/(Df + Dn) # distance de mise au point
         # c = f**2*(Df - Dn)/(N*(2000*Df*Dn - f*(Df + Dn))) # diamètre du cercle de confusion 
 
-        # Distance hyperfocale en m
-        H = (f + f**2/(N*c)) / 1000
-        # Distance minimale de netteté
-        Dn = s * (H - f/1000) / (H + s - 2*f/1000)
-        # Distance maximale de netteté
-        if (H - s) <= 0:
-            Df = numpy.Infinity
-        else:
-            Df = s * (H - f/1000) / (H - s)
+        # Distance hyperfocale, distances minimale et maximale de netteté en m
+        H = self.hyperfocal_distance
+        Dn = self.focusing_distance_near
+        Df = self.focusing_distance_far
         
         width = self.size().width()
-        height = 58
-        d_width = int(width - 30 - 2)
-
-        dof_origin = self._origin
-        dof_values = [v for v in (0.125, 0.25, 1, 2, 3, 4, 6, 10, 20, 50) if v > dof_origin]
-        dof_values.insert(0, dof_origin)
-        dof_minors = [v for v in (0.5, 1.5, 2.5, 5) if v > dof_origin]
+        d_width = int(width - 2*SCALE_MARGIN - 2)
 
         Dn_hyperfocal = H/2
 
-        Dn_h_px = int(15 + d_width * self._scalein(Dn_hyperfocal))
-        H_px = int(15 + d_width * self._scalein(H))
-        focusing_distance_px = int(15 + d_width * self._scalein(s))
-        Dn_px = int(15 + d_width * self._scalein(Dn))
-        Df_px = int(15 + d_width * self._scalein(Df))
+        locations_px = SCALE_MARGIN + d_width * self._scalein(numpy.array([Dn_hyperfocal, H, s, Dn, Df]))
+        Dn_h_px, H_px, focusing_distance_px, Dn_px, Df_px = (int(x) for x in locations_px)
 
         if Df >= 999.5:
             dof_px = (int(width-1 + 5) - Dn_px)
@@ -607,10 +1234,90 @@ class DofBar(QAbstractSlider):
         else:
             offset2 = 0
 
-        if Df >= 999.5:
+        return dict(Dn_h=Dn_h_px,
+                    H=H_px,
+                    dof=dof_px,
+                    Dn_num=Dn,
+                    Dn=Dn_px,
+                    Dn_left=Dn_px-15-offset1+offset2,
+                    Dn_center=Dn_px-offset1+offset2,
+                    Df_num=None if Df >= 999.5 else Df, # infini
+                    Df=Df_px,
+                    Df_left=Df_px-15+offset1+offset2,
+                    Df_center=Df_px+offset1+offset2,
+                    focus_num=s,
+                    focus=focusing_distance_px,
+                    focus_left=focusing_distance_px-15)
+
+    def draw(self, painter):
+        '''
+        Dessine le slider avec `painter`, à l'identique de `generate_svg()`
+        '''
+        g = self._geometry()
+
+        painter.save()
+        painter.translate(0.5, 25.5)
+        self._draw_hyperfocal(painter, g)
+        self._draw_scale(painter)
+        self._draw_markers(painter, g)
+        painter.restore()
+
+    def _draw_hyperfocal(self, painter, g):
+        '''
+        Dessine le fond de l'échelle et la zone au-delà de la demi-hyperfocale
+        '''
+        width = self.size().width()
+        _draw_rect(painter, 0, 0, int(width-1), 26, 4, fill='white')
+
+        x1 = g['Dn_h'] + int(width-1 - g['Dn_h'])
+        band = QPainterPath(QPointF(g['Dn_h'], 22))
+        band.lineTo(x1, 22)
+        band.arcTo(QRectF(x1-8, 18, 8, 8), 0, -90)
+        band.lineTo(x1-4 - int(width-1 - g['Dn_h'] - 4), 26)
+        band.closeSubpath()
+        painter.fillPath(band, QColor('#b6ddff'))
+        _draw_line(painter, g['H'], 22, g['H'], 26, '#0066c5')
+
+    def _draw_scale(self, painter):
+        '''
+        Dessine le cadre et les graduations de l'échelle
+        '''
+        width = self.size().width()
+        _draw_rect(painter, 0, 0, int(width-1), 26, 4, stroke='#888888')
+        _draw_text(painter, 32, 16, 'm', 10, 'red')
+        for location_px, label in self._ticks():
+            text = '·' if label is None else '{:.3g}'.format(label)
+            _draw_text(painter, location_px, 17, text, 12, 'black', anchor='middle')
+        _draw_text(painter, int(width-1 - 15), 17, '∞', 12, 'black')
+
+    def _draw_markers(self, painter, g):
+        '''
+        Dessine le repère de mise au point et les limites de netteté
+        '''
+        if g['dof'] > 0:
+            _draw_rect(painter, g['Dn'], -6, g['dof'], 38, 3, stroke='black')
+        _draw_line(painter, g['focus'], -6, g['focus'], 32, 'red')
+
+        Df_str = '∞' if g['Df_num'] is None else '{:.3g}'.format(g['Df_num'])
+        for x, left, center, text in ((g['Dn'], g['Dn_left'], g['Dn_center'], '{:.3g}'.format(g['Dn_num'])),
+                                      (g['Df'], g['Df_left'], g['Df_center'], Df_str)):
+            _draw_line(painter, x, 11-25, x, 18-25, '#0066c5')
+            _draw_rect(painter, left, -25, 30, 14, 3, fill='#0066c5', stroke='#0066c5')
+            _draw_text(painter, center, 10-25, text, 10, 'white', anchor='middle')
+
+        _draw_rect(painter, g['focus_left'], 6, 30, 14, 3, fill='white', stroke='red')
+        _draw_text(painter, g['focus'], 6+10.5, '{:.3g}'.format(g['focus_num']), 10, 'red', anchor='middle')
+
+    @instrumentation.timed('svg')
+    def generate_svg(self):
+        width = self.size().width()
+        height = 58
+        g = self._geometry()
+
+        if g['Df_num'] is None:
             Df_str = '&#8734;' # infinity
         else:
-            Df_str = '{:.3g}'.format(Df)
+            Df_str = '{:.3g}'.format(g['Df_num'])
 
         svg = list()
         svg.append('''<?xml version="1.0" encoding="utf-8"?>
@@ -655,31 +1362,17 @@ viewBox="0 0 {w} {h}"
     font-size="10"
     fill="red">
     m
-    </text>'''.format(w=int(width-1), Dn_h=Dn_h_px, H=H_px, H_w=int(width-1 - Dn_h_px), H_wb=-int(width-1 - Dn_h_px - 4)))
-
-        for dof_value in dof_values: # (0.3, 1, 2, 3, 4, 6, 10, 20, 50)
-            location_pc = self._scalein(dof_value)
-            location_px = 15 + d_width * location_pc
-            svg.append('''    <text
-    x="{}" y="17"
-    text-anchor="middle"
-    font-family="Segoe UI"
-    font-size="12"
-    fill="black">
-    {:.3g}
-    </text>'''.format(int(location_px), dof_value))
+    </text>'''.format(w=int(width-1), Dn_h=g['Dn_h'], H=g['H'], H_w=int(width-1 - g['Dn_h']), H_wb=-int(width-1 - g['Dn_h'] - 4)))
 
-        for dof_value in dof_minors: # (0.5, 1.5, 2.5)
-            location_pc = self._scalein(dof_value)
-            location_px = 15 + d_width * location_pc
+        for location_px, label in self._ticks():
             svg.append('''    <text
     x="{}" y="17"
     text-anchor="middle"
     font-family="Segoe UI"
     font-size="12"
     fill="black">
-    &#183;
-    </text>'''.format(int(location_px)))
+    {}
+    </text>'''.format(location_px, '&#183;' if label is None else '{:.3g}'.format(label)))
 
         svg.append('''    <text
     x="{}" y="17"
@@ -703,7 +1396,7 @@ viewBox="0 0 {w} {h}"
         stroke="red"
         stroke-width="1"
         x1="{focus}" y1="-6"
-        x2="{focus}" y2="32" />'''.format(Dn=Dn_px, Df=Df_px, focus=focusing_distance_px, dof=dof_px))
+        x2="{focus}" y2="32" />'''.format(Dn=g['Dn'], focus=g['focus'], dof=g['dof']))
 
         svg.append('''      <g
         id="near"
@@ -771,17 +1464,7 @@ viewBox="0 0 {w} {h}"
         fill="red">
         {focus_num:.3g}
         </text>
-    </g>'''.format(Dn_num=Dn,
-                    Dn=Dn_px,
-                    Dn_left=Dn_px-15-offset1+offset2,
-                    Dn_center=Dn_px-offset1+offset2,
-                    Df_num=Df_str,
-                    Df=Df_px,
-                    Df_left=Df_px-15+offset1+offset2,
-                    Df_center=Df_px+offset1+offset2,
-                    focus_num=s,
-                    focus=focusing_distance_px,
-                    focus_left=focusing_distance_px-15))
+    </g>'''.format(**dict(g, Df_num=Df_str)))
 
         svg.append('''    </g>
 </g>
@@ -0,0 +1,207 @@
+'''
+Calculs optiques (profondeur de champ, angle de champ) vectorisés avec numpy.
+
+Unités : focale, cercle de confusion et capteur en mm, distances en m.
+Toutes les fonctions acceptent des scalaires ou des tableaux numpy, qui sont
+combinés selon les règles de broadcasting de numpy.
+
+Ce module ne dépend que de numpy (ni Qt, ni effet de bord à l'import) : les
+traitements par lots l'importent seul, voir `benchmarks.py -k import`.
+'''
+from collections import namedtuple
+
+import numpy
+
+
+# Ouvertures du slider FNumberBar : valeurs exactes 2**((i+3)/6) et valeurs gravées
+F_TRUE_VALUES = numpy.array([1.4142135623730951, 1.5874010519681994, 1.7817974362806785, 2.0,
+    2.244924096618746, 2.5198420997897464, 2.8284271247461903, 3.174802103936399, 3.563594872561357, 4.0,
+    4.489848193237491, 5.039684199579493, 5.656854249492381, 6.3496042078727974, 7.127189745122715, 8.0,
+    8.979696386474982, 10.079368399158986, 11.313708498984761, 12.699208415745595, 14.25437949024543, 16.0,
+    17.959392772949972, 20.158736798317967, 22.627416997969522], dtype=float)
+F_VALUES = numpy.array([1.4, 1.6, 1.8, 2.0, 2.2, 2.5, 2.8, 3.2, 3.5, 4.0, 4.5, 5.0, 5.6, 6.3, 7.1, 8.0, 9.0, 10.0,
+    11.0, 13.0, 14.0, 16.0, 18.0, 20.0, 22.0], dtype=float)
+
+# Diagonale du capteur divisée par le diamètre du cercle de confusion
+CONFUSION_PRESETS = {
+    'DIGITAL': 1442, # Valeur en photo numérique
+    'ZEISS': 1730, # Formule de Zeiss (plus sévère)
+}
+
+# Plage d'affichage de la profondeur de champ, en échelle logarithmique (m)
+DOF_RANGE = (1e-3, 1e3)
+
+# Longueur d'onde de la lumière pour la limite de diffraction (m)
+WAVELENGTH = 550e-9
+
+OpticsResult = namedtuple('OpticsResult', (
+    'hyperfocal', 'near', 'far', 'fov', 'plane_width', 'plane_height'))
+
+DofSolution = namedtuple('DofSolution', (
+    'index', 'f_number', 'focusing_distance', 'near', 'far', 'covered', 'diffraction_limited'))
+
+
+def hyperfocal_distance(focal_length, f_number, confusion):
+    '''
+    Distance hyperfocale (m)
+    '''
+    f = numpy.asarray(focal_length, dtype=float)
+    return (f + f**2/(f_number*confusion)) / 1000
+
+
+def focusing_distance_near(focusing_distance, focal_length, hyperfocal):
+    '''
+    Distance minimale de netteté (m)
+    '''
+    s = numpy.asarray(focusing_distance, dtype=float)
+    f_m = numpy.asarray(focal_length, dtype=float) / 1000
+    return s * (hyperfocal - f_m) / (hyperfocal + s - 2*f_m)
+
+
+def focusing_distance_far(focusing_distance, focal_length, hyperfocal):
+    '''
+    Distance maximale de netteté (m), infinie au-delà de l'hyperfocale
+    '''
+    s = numpy.asarray(focusing_distance, dtype=float)
+    f_m = numpy.asarray(focal_length, dtype=float) / 1000
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        far = s * (hyperfocal - f_m) / (hyperfocal - s)
+    return numpy.where(hyperfocal - s <= 0, numpy.inf, far)
+
+
+def minimum_focusing_distance(near_limit, focal_length, hyperfocal):
+    '''
+    Distance de mise au point (m) pour laquelle la netteté commence à `near_limit`
+    '''
+    Dn = numpy.asarray(near_limit, dtype=float)
+    f_m = numpy.asarray(focal_length, dtype=float) / 1000
+    return Dn * (hyperfocal - 2*f_m) / (hyperfocal - f_m - Dn)
+
+
+def fov_angle(focal_length, sensor_width, sensor_height):
+    '''
+    Angle de champ diagonal (°)
+    '''
+    diagonal = numpy.hypot(sensor_width, sensor_height)
+    return numpy.degrees(2*numpy.arctan(diagonal / (2*numpy.asarray(focal_length, dtype=float))))
+
+
+def focus_plane_size(focusing_distance, focal_length, sensor_size):
+    '''
+    Largeur ou hauteur (m) du plan de netteté pour une dimension du capteur
+    '''
+    f = numpy.asarray(focal_length, dtype=float)
+    return (focusing_distance - 0.001*f) * sensor_size / f
+
+
+def compute(focal_length, f_number, confusion, sensor_width, sensor_height, focusing_distance):
+    '''
+    Calcule en un seul appel toutes les grandeurs affichées par l'interface.
+
+    Les paramètres sont combinés par broadcasting ; chaque champ du résultat a
+    la forme commune des entrées.
+    '''
+    shape = numpy.broadcast_shapes(*(numpy.shape(x) for x in (
+        focal_length, f_number, confusion, sensor_width, sensor_height, focusing_distance)))
+
+    H = hyperfocal_distance(focal_length, f_number, confusion)
+    result = OpticsResult(
+        hyperfocal=H,
+        near=focusing_distance_near(focusing_distance, focal_length, H),
+        far=focusing_distance_far(focusing_distance, focal_length, H),
+        fov=fov_angle(focal_length, sensor_width, sensor_height),
+        plane_width=focus_plane_size(focusing_distance, focal_length, sensor_width),
+        plane_height=focus_plane_size(focusing_distance, focal_length, sensor_height),
+    )
+    return OpticsResult(*(numpy.broadcast_to(x, shape) for x in result))
+
+
+def dof_grid(focal_length, confusion, f_numbers, focusing_distances):
+    '''
+    Limites proche et lointaine (m) sur la grille ouvertures × distances de
+    mise au point : tableaux (len(f_numbers), len(focusing_distances)), calculés
+    en une passe
+    '''
+    H = hyperfocal_distance(focal_length, numpy.asarray(f_numbers, dtype=float)[:, None], confusion)
+    s = numpy.asarray(focusing_distances, dtype=float)[None, :]
+    return focusing_distance_near(s, focal_length, H), focusing_distance_far(s, focal_length, H)
+
+
+def airy_disc_size(f_number, wavelength=WAVELENGTH):
+    '''
+    Limite de diffraction : diamètre de la tache d'Airy (mm)
+    '''
+    return 2.44*wavelength*numpy.asarray(f_number, dtype=float)*1000
+
+
+def diffraction_limited(f_numbers, confusion, wavelength=WAVELENGTH):
+    '''
+    Masque des ouvertures dont la tache d'Airy dépasse le cercle de confusion
+    '''
+    return airy_disc_size(f_numbers, wavelength) > confusion
+
+
+def solve_dof(near_limit, far_limit, focal_length, confusion, f_numbers=F_TRUE_VALUES):
+    '''
+    Plus petite ouverture de `f_numbers` (triées) et distance de mise au point
+    pour lesquelles la zone de netteté couvre [near_limit, far_limit] (m) ;
+    `far_limit` peut être infini.
+
+    Les distances nette proche et lointaine vérifient 1/Dn + 1/Df = 2/s : la
+    mise au point est donc s = 2·Dn·Df/(Dn + Df) (2·Dn si Df est infinie),
+    puis toutes les ouvertures sont évaluées en un seul calcul. `covered` est
+    le masque des ouvertures qui conviennent ; si aucune ne convient, `index`
+    et `f_number` valent None et `near`/`far` sont ceux de la plus petite
+    ouverture. `diffraction_limited` indique si la tache d'Airy de
+    l'ouverture retenue dépasse le cercle de confusion.
+    '''
+    near_limit = float(near_limit)
+    far_limit = float(far_limit)
+    if not 0 < near_limit < far_limit:
+        raise ValueError('`near_limit` should be positive and smaller than `far_limit`')
+
+    if numpy.isinf(far_limit):
+        s = 2*near_limit
+    else:
+        s = 2*near_limit*far_limit / (near_limit + far_limit)
+
+    f_numbers = numpy.asarray(f_numbers, dtype=float)
+    H = hyperfocal_distance(focal_length, f_numbers, confusion)
+    near = focusing_distance_near(s, focal_length, H)
+    far = focusing_distance_far(s, focal_length, H)
+    tolerance = 1e-9
+    covered = (near <= near_limit*(1 + tolerance)) & (far >= far_limit*(1 - tolerance))
+
+    candidates = numpy.flatnonzero(covered)
+    if len(candidates) == 0:
+        i = len(f_numbers) - 1
+        return DofSolution(None, None, s, float(near[i]), float(far[i]), covered, False)
+    i = int(candidates[0])
+    return DofSolution(i, float(f_numbers[i]), s, float(near[i]), float(far[i]), covered,
+                       bool(diffraction_limited(f_numbers[i], confusion)))
+
+
+def confusion_size(sensor_width, sensor_height, option='DIGITAL'):
+    '''
+    Diamètre du cercle de confusion (mm) pour une taille de capteur donnée (mm)
+    '''
+    return numpy.hypot(sensor_width, sensor_height) / CONFUSION_PRESETS[option.upper()]
+
+
+def format_distance_m(m, infinity_limit=1e6):
+    '''
+    Distance (m) formatée avec l'unité la plus lisible
+    '''
+    abs_m = abs(m)
+    if 0<=abs_m<0.001 and abs_m<infinity_limit:
+        return ('{:0.3f} µm'.format(m*1e6))
+    elif 0.001<=abs_m<0.01 and abs_m<infinity_limit:
+        return ('{:0.3g} mm'.format(m*1000))
+    elif 0.01<abs_m<1 and abs_m<infinity_limit:
+        return ('{:0.3g} cm'.format(m*100))
+    elif 1<=abs_m<1000 and abs_m<infinity_limit:
+        return ('{:0.3g} m'.format(m))
+    elif 1000<=abs_m<infinity_limit:
+        return ('{:0.3g} km'.format(m/1000))
+    else:
+        return 'inf' if numpy.sign(m)==1 else '-inf'
@@ -0,0 +1,104 @@
+'''
+Cache de rendus (QPixmap) à éviction LRU, borné en mémoire.
+'''
+from collections import OrderedDict
+
+
+class PixmapCache:
+    '''
+    Associe une clé décrivant l'état complet d'un rendu au pixmap obtenu.
+
+    Les entrées les moins récemment utilisées sont évincées dès que la taille
+    totale des pixmaps dépasse `max_bytes`. Les compteurs `hits` et `misses`
+    permettent de dimensionner le cache.
+    '''
+
+    def __init__(self, max_bytes=4*1024*1024):
+        self._pixmaps = OrderedDict()
+        self._bytes = 0
+        self._max_bytes = int(max_bytes)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._pixmaps)
+
+    def __contains__(self, key):
+        return key in self._pixmaps
+
+    @property
+    def max_bytes(self):
+        return self._max_bytes
+
+    @property
+    def size_bytes(self):
+        return self._bytes
+
+    @staticmethod
+    def cost(pixmap):
+        '''
+        Mémoire occupée par `pixmap` (octets)
+        '''
+        return pixmap.width() * pixmap.height() * pixmap.depth() // 8
+
+    def set_max_bytes(self, max_bytes):
+        self._max_bytes = int(max_bytes)
+        self._evict()
+
+    def get(self, key):
+        '''
+        Retourne le pixmap associé à `key`, ou `None`
+        '''
+        pixmap = self._pixmaps.get(key)
+        if pixmap is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._pixmaps.move_to_end(key)
+        return pixmap
+
+    def insert(self, key, pixmap):
+        '''
+        Ajoute `pixmap` au cache ; un pixmap plus grand que le cache entier
+        n'est pas conservé
+        '''
+        self.remove(key)
+        cost = self.cost(pixmap)
+        if cost > self._max_bytes:
+            return
+        self._pixmaps[key] = pixmap
+        self._bytes += cost
+        self._evict()
+
+    def pixmap(self, key, render):
+        '''
+        Retourne le pixmap associé à `key`, en appelant `render()` pour le
+        produire s'il n'est pas dans le cache
+        '''
+        pixmap = self.get(key)
+        if pixmap is None:
+            pixmap = render()
+            self.insert(key, pixmap)
+        return pixmap
+
+    def remove(self, key):
+        pixmap = self._pixmaps.pop(key, None)
+        if pixmap is not None:
+            self._bytes -= self.cost(pixmap)
+
+    def clear(self):
+        self._pixmaps.clear()
+        self._bytes = 0
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        return dict(hits=self.hits, misses=self.misses, entries=len(self._pixmaps),
+                    size_bytes=self._bytes, max_bytes=self._max_bytes)
+
+    def _evict(self):
+        while self._bytes > self._max_bytes and self._pixmaps:
+            _, pixmap = self._pixmaps.popitem(last=False)
+            self._bytes -= self.cost(pixmap)
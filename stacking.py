@@ -0,0 +1,123 @@
+'''
+Planification d'un empilement de mises au point (focus stacking) : suite
+minimale de distances de mise au point dont les zones de netteté couvrent une
+profondeur donnée, en se chevauchant.
+
+    python stacking.py --near 0.3 --far 0.5 --focal 100 --fnumber 8 -o prises.csv
+    python stacking.py --near 2 --far inf --focal 24 --fnumber 5.6 --sensor 36 24
+'''
+import sys
+import csv
+import math
+import argparse
+from collections import namedtuple
+
+import numpy
+
+import optics
+
+StackPlan = namedtuple('StackPlan', ('focusing_distances', 'near', 'far'))
+
+
+def plan(near_limit, far_limit, focal_length, f_number, confusion, overlap=0.2, max_shots=1000000):
+    '''
+    Distances de mise au point (m), de la plus proche à la plus lointaine,
+    couvrant [near_limit, far_limit] (m, `far_limit` peut être infini) avec le
+    moins de prises possible. Deux zones de netteté consécutives partagent la
+    fraction `overlap` (0 <= overlap < 1) de la profondeur de la première,
+    mesurée en inverse de distance.
+
+    En inverse de distance (u = 1/s), les limites de netteté de `optics` sont
+    affines : 1/Dn = a·u + 1/K et 1/Df = c·u - 1/K, avec K = H - f,
+    a = 1 - f/K et c = 1 + f/K. La suite des prises vérifie donc
+    u[n+1] = α·u[n] - β, de solution u[n] = 1/f - (1/f - u[0])·α**n avec
+    α = o + (1 - o)·c/a : le nombre de prises et leurs distances sont calculés
+    directement.
+
+    Retourne un `StackPlan` de tableaux (distances, limites proches, limites
+    lointaines).
+    '''
+    if not 0 <= overlap < 1:
+        raise ValueError('`overlap` should be in [0, 1)')
+    f_m = focal_length / 1000
+    if not f_m < near_limit < far_limit:
+        raise ValueError('`near_limit` should be greater than the focal length and smaller than `far_limit`')
+
+    H = float(optics.hyperfocal_distance(focal_length, f_number, confusion))
+    K = H - f_m
+    a = 1 - f_m/K
+    c = 1 + f_m/K
+    alpha = overlap + (1 - overlap)*c/a
+
+    # Première prise : netteté à partir de near_limit ; dernière : netteté
+    # au-delà de far_limit
+    u_first = (1/near_limit - 1/K) / a
+    u_last = (1/far_limit + 1/K) / c
+    if u_first <= 1/H:
+        # La mise au point à l'hyperfocale suffit
+        s = numpy.array([H])
+    else:
+        if u_first <= u_last:
+            count = 1
+        else:
+            count = 1 + math.ceil(math.log((1/f_m - u_last) / (1/f_m - u_first)) / math.log(alpha) - 1e-12)
+        if count > max_shots:
+            raise ValueError('{} shots needed (max_shots = {})'.format(count, max_shots))
+        u = 1/f_m - (1/f_m - u_first) * alpha**numpy.arange(count)
+        s = 1 / u
+        # La dernière prise dépasserait u_last (voire u < 0) : elle est
+        # ramenée à u_last, soit l'hyperfocale si far_limit est infini
+        if u[-1] < u_last:
+            s[-1] = H if math.isinf(far_limit) else 1/u_last
+
+    near = optics.focusing_distance_near(s, focal_length, H)
+    far = optics.focusing_distance_far(s, focal_length, H)
+    if not (s > 0).all() or far[-1] < far_limit * (1 - 1e-9):
+        raise ArithmeticError('invalid stack: distances {}, last far limit {}'.format(s, far[-1]))
+    return StackPlan(s, near, far)
+
+
+def write_shot_list(stack, f, format_distances=False):
+    '''
+    Écrit la liste des prises au format CSV dans le fichier texte `f`
+    '''
+    writer = csv.writer(f, lineterminator='\n')
+    writer.writerow(('shot', 'distance_m', 'near_m', 'far_m'))
+    for i, row in enumerate(zip(*(x.tolist() for x in stack)), 1):
+        if format_distances:
+            row = [optics.format_distance_m(v, infinity_limit=999.5) for v in row]
+        writer.writerow((i, *row))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--near', type=float, required=True, help='début de la zone à couvrir (m)')
+    parser.add_argument('--far', type=float, required=True, help='fin de la zone à couvrir (m), inf accepté')
+    parser.add_argument('--focal', type=float, required=True, help='focale (mm)')
+    parser.add_argument('--fnumber', type=float, required=True)
+    parser.add_argument('--confusion', default='DIGITAL',
+                        help='DIGITAL, ZEISS (avec --sensor) ou diamètre du cercle de confusion en mm')
+    parser.add_argument('--sensor', type=float, nargs=2, default=(36.0, 24.0), metavar=('W', 'H'),
+                        help='taille du capteur (mm), défaut 36 24')
+    parser.add_argument('--overlap', type=float, default=0.2, help='chevauchement des zones de netteté')
+    parser.add_argument('--format-distances', action='store_true', help='formate les distances avec leur unité')
+    parser.add_argument('-o', '--output', default='-', help='fichier de sortie (défaut : sortie standard)')
+    args = parser.parse_args(argv)
+
+    confusion = args.confusion
+    if confusion.upper() in optics.CONFUSION_PRESETS:
+        confusion = float(optics.confusion_size(*args.sensor, confusion))
+    else:
+        confusion = float(confusion)
+
+    stack = plan(args.near, args.far, args.focal, args.fnumber, confusion, args.overlap)
+    if args.output == '-':
+        write_shot_list(stack, sys.stdout, args.format_distances)
+    else:
+        with open(args.output, 'wt', encoding='utf-8', newline='') as f:
+            write_shot_list(stack, f, args.format_distances)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+
+@pytest.fixture(scope='session')
+def qapp(tmp_path_factory):
+    # Réglages QSettings isolés de ceux de l'utilisateur
+    os.environ['XDG_CONFIG_HOME'] = str(tmp_path_factory.mktemp('config'))
+    from PySide6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
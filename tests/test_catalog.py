@@ -0,0 +1,68 @@
+import os
+import json
+
+import pytest
+
+from catalog import CatalogIndex, load_catalog
+from catalogwidgets import CatalogComboBox
+
+
+CATALOG = {
+    'SENSOR_SIZES': {'APS-C': [22.2, 14.8], 'Full frame': [36.0, 24.0]},
+    'LENS_FOCALS': {'24 mm': 24.0, 'Personnalisé...': 35.0},
+}
+NAMES = [f'{brand} Model {i} Mark {i % 7}'
+         for i, brand in enumerate(['Canon', 'Nikon', 'Sony', 'Sigma'] * 500)]
+
+
+def test_index_built_by_steps_matches_full_build():
+    full = CatalogIndex(NAMES)
+    stepped = CatalogIndex(NAMES, build=False)
+    steps = stepped.build_steps(300)
+    next(steps)
+    # Recherche possible pendant la construction, sur les noms déjà découpés
+    assert not stepped.ready
+    assert stepped.search('canon mark 3', 1000) == [
+        i for i in full.search('canon mark 3', 1000) if i < 300]
+    for _ in steps:
+        pass
+    assert stepped.ready
+    assert (stepped._tokens, stepped._ids) == (full._tokens, full._ids)
+    for query in ['s', 'sigma model 12', 'mark 6 nikon', 'zz']:
+        assert stepped.search(query, 1000) == full.search(query, 1000)
+
+
+def test_combo_search_before_index_ready(qapp):
+    combo = CatalogComboBox(NAMES)
+    expected = CatalogIndex(NAMES).search('sony model 2', combo.MAX_MATCHES)
+    assert not combo.index.ready
+    qapp.processEvents()
+    assert set(combo.search('sony model 2')) <= set(expected)
+    while not combo.index.ready:
+        qapp.processEvents()
+    assert combo.search('sony model 2') == expected
+    combo.deleteLater()
+
+
+@pytest.mark.parametrize('damage', ['truncate', 'corrupt'])
+def test_damaged_cache_is_recompiled(tmp_path, damage):
+    path = tmp_path / 'constants.json'
+    path.write_text(json.dumps(CATALOG), encoding='utf-8')
+    load_catalog(str(path))
+    cache_path = tmp_path / 'constants.cache'
+    data = bytearray(cache_path.read_bytes())
+    # En-tête intact, corps endommagé
+    if damage == 'truncate':
+        data = data[:len(data) // 2]
+    else:
+        data[len(data) - 20:] = b'\xff' * 20
+    cache_path.write_bytes(bytes(data))
+    stat = os.stat(path)
+    assert int.from_bytes(data[8:16], 'little') == stat.st_size
+
+    sensors, lenses = load_catalog(str(path))
+    assert dict(sensors) == CATALOG['SENSOR_SIZES']
+    assert dict(lenses) == CATALOG['LENS_FOCALS']
+    del sensors, lenses
+    sensors, _ = load_catalog(str(path))
+    assert list(sensors) == list(CATALOG['SENSOR_SIZES'])
@@ -0,0 +1,24 @@
+import numpy
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QPainterPath
+
+from dofchart import path_from_arrays
+
+
+def test_path_from_arrays_matches_move_line(qapp):
+    x = numpy.linspace(0.5, 300.5, 601)
+    y = 40 + 30*numpy.sin(x / 17)
+    path = path_from_arrays(x, y)
+
+    expected = QPainterPath()
+    expected.setFillRule(Qt.OddEvenFill)
+    expected.moveTo(x[0], y[0])
+    for xi, yi in zip(x[1:], y[1:]):
+        expected.lineTo(xi, yi)
+
+    assert path == expected
+    assert path.fillRule() == expected.fillRule()
+    assert path.elementCount() == expected.elementCount() == len(x)
+    for i in range(len(x)):
+        a, b = path.elementAt(i), expected.elementAt(i)
+        assert (a.type, a.x, a.y) == (b.type, b.x, b.y)
@@ -0,0 +1,55 @@
+import time
+
+import gui
+
+
+def test_sensor_change_notifies_once(qapp):
+    window = gui.MainWindow()
+    qapp.processEvents()
+    window.model.flush()
+    emitted = []
+    window.model.changed.connect(emitted.append)
+
+    index = (window.combo_sensors.currentIndex() + 2) % window.combo_sensors.count()
+    window.combo_sensors.setCurrentIndex(index)
+    for _ in range(5):
+        qapp.processEvents()
+
+    assert emitted == [frozenset({'sensor_size', 'confusion'})]
+    w, h = window.model.sensor_size
+    assert window.model.confusion_size == float(window._confusion_size(
+        window._confusion_dict[window.combo_confusions.currentText()]))
+    window.deleteLater()
+
+
+def test_deferred_session_restored_without_paint(qapp):
+    # Fenêtre jamais affichée : la session est restaurée quand même
+    window = gui.MainWindow(deferred=True)
+    assert not window.initialized
+    deadline = time.perf_counter() + 5 * window.SESSION_DELAY / 1000
+    while not window.initialized and time.perf_counter() < deadline:
+        qapp.processEvents()
+    assert window.initialized
+    assert window.combo_sensors.count() == len(gui.SENSOR_SIZES)
+    window.autosaver.stop()
+    window.deleteLater()
+
+
+def test_apply_solver_updates_model_focus(qapp):
+    window = gui.MainWindow()
+    window.solver_near_spin.setValue(10)
+    window.solver_infinity_check.setChecked(False)
+    window.solver_far_spin.setValue(30)
+    solution = window.solve_dof()
+    assert solution.index is not None
+    # Slider déjà à la position de la solution, modèle à une autre distance
+    window.dof_bar.setFocusDistance(solution.focusing_distance)
+    window.model.setFocusDistance(solution.focusing_distance * 1.0001)
+    window.model.flush()
+
+    window.apply_solver()
+    window.model.flush()
+    assert window.model.focusing_distance == window.dof_bar.focusing_distance
+    assert abs(window.model.focusing_distance - solution.focusing_distance) < 1e-9
+    window.autosaver.stop()
+    window.deleteLater()
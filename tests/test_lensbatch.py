@@ -0,0 +1,38 @@
+import io
+
+import numpy
+
+import lensbatch
+
+
+SENSORS = {'APS-C': [22.2, 14.8], 'Full frame': [36.0, 24.0]}
+LENSES = {'24 mm': 24.0, '600 mm': 600.0}
+DISTANCES = (0.05, 0.3, 0.5, 1, 10)
+
+
+def _grid(**kwargs):
+    chunks = list(lensbatch.iter_grid(SENSORS, LENSES, DISTANCES, **kwargs))
+    return {name: numpy.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+
+
+def test_grid_omits_unreachable_distances():
+    grid = _grid(chunk_size=7)
+    assert 0 < len(grid['sensor']) < len(SENSORS) * len(LENSES) * 25 * len(DISTANCES)
+    # 0,05 m et 0,5 m sont plus courtes que la mise au point minimale du 600 mm
+    assert 0.05 not in grid['distance_m']
+    assert not numpy.any((grid['focal_mm'] == 600) & (grid['distance_m'] <= 0.5))
+    assert numpy.all(grid['near_m'] >= lensbatch.NEAR_LIMIT * (1 - 1e-9))
+    assert numpy.all(grid['near_m'] <= grid['distance_m'])
+    assert numpy.all(grid['plane_width_m'] > 0)
+    assert numpy.all(grid['plane_height_m'] > 0)
+
+
+def test_columnar_round_trip_with_omitted_rows(tmp_path):
+    path = tmp_path / 'grid.lcol'
+    with open(path, 'wb') as f:
+        lensbatch.write_columnar(lensbatch.iter_grid(SENSORS, LENSES, DISTANCES, chunk_size=5),
+                                 f, list(SENSORS), list(LENSES))
+    columns, _ = lensbatch.read_columnar(path)
+    grid = _grid()
+    for name in grid:
+        assert numpy.array_equal(columns[name], grid[name])